@@ -3,7 +3,8 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from .forms import LoginForm, RegisterForm, ProfileForm, CustomPasswordChangeForm
-from cart.models import Cart, CartItem, Order, Favorite
+from cart.models import Order, Favorite
+from cart.anonymous import AnonymousCart
 from django.contrib.auth.models import User
 from products.models import Product
 from django.http import HttpResponseRedirect
@@ -20,25 +21,10 @@ def login_view(request):
     if request.method == 'POST' and form.is_valid():
         user = form.get_user()
         login(request, user)
-        session_cart, _ = Cart.objects.get_or_create(
-            user=None,
-            session_id=request.session.session_key or request.session.create()
-        )
-        user_cart, _ = Cart.objects.get_or_create(user=user)
-        for item in session_cart.cartitem_set.all():
-            user_item, created = CartItem.objects.get_or_create(
-                cart=user_cart,
-                product=item.product,
-                color=item.color,
-                size=item.size,
-                defaults={'quantity': item.quantity}
-            )
-            if not created:
-                user_item.quantity += item.quantity
-                user_item.save()
-        session_cart.delete()
+        anonymous_cart = AnonymousCart.from_request(request)
+        anonymous_cart.transfer(user)
         messages.success(request, 'با موفقیت وارد شدید.')
-        return redirect('account:profile')
+        return anonymous_cart.save(redirect('account:profile'))
     return render(request, 'account/login.html', {'form': form})
 
 def register_view(request):
@@ -49,25 +35,10 @@ def register_view(request):
         user = form.save()
         login(request, user)
 
-        session_cart, _ = Cart.objects.get_or_create(
-            user=None,
-            session_id=request.session.session_key or request.session.create()
-        )
-        user_cart, _ = Cart.objects.get_or_create(user=user)
-        for item in session_cart.cartitem_set.all():
-            user_item, created = CartItem.objects.get_or_create(
-                cart=user_cart,
-                product=item.product,
-                color=item.color,
-                size=item.size,
-                defaults={'quantity': item.quantity}
-            )
-            if not created:
-                user_item.quantity += item.quantity
-                user_item.save()
-        session_cart.delete()
+        anonymous_cart = AnonymousCart.from_request(request)
+        anonymous_cart.transfer(user)
         messages.success(request, 'ثبت‌نام با موفقیت انجام شد.')
-        return redirect('account:profile')
+        return anonymous_cart.save(redirect('account:profile'))
     return render(request, 'account/register.html', {'form': form})
 
 @login_required
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Cart, CartItem, Address, Order, OrderItem
+from . import rollups, tracking
+from .models import Cart, CartItem, Address, Order, OrderItem, OrderStatusEvent, ArchivedOrder, ArchivedOrderItem
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -70,6 +71,22 @@ class OrderAdmin(admin.ModelAdmin):
 
     readonly_fields = ['get_products', 'get_items_count', 'get_full_address', 'created_at', 'updated_at']
 
+    def save_model(self, request, obj, form, change):
+        """تغییر وضعیت از پنل ادمین هم در تاریخچه وضعیت سفارش ثبت می‌شود"""
+        # سهم قبلی سفارش در جدول‌های تجمیعی پیش از ذخیره وضعیت و ردیف‌های جدید خوانده می‌شود
+        obj._sales_before = rollups.snapshot([obj.pk]) if change else {}
+        super().save_model(request, obj, form, change)
+        if not change or 'status' in form.changed_data:
+            event = OrderStatusEvent.objects.create(
+                order=obj, status=obj.status, description='تغییر از پنل مدیریت' if change else ''
+            )
+            tracking.notify(obj.pk, event.pk)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        rollups.replace(getattr(order, '_sales_before', {}), rollups.snapshot([order.pk]))
+
     def get_products(self, obj):
         """نمایش نام محصولات در سفارش"""
         return ", ".join([item.product.name for item in obj.orderitems.all()])[:100]
@@ -96,4 +113,29 @@ class OrderItemAdmin(admin.ModelAdmin):
 
     def get_total_price(self, obj):
         return obj.get_total_price()
-    get_total_price.short_description = 'قیمت کل'
\ No newline at end of file
+    get_total_price.short_description = 'قیمت کل'
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ['product', 'color', 'size', 'quantity', 'unit_price', 'discount']
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """سفارش‌های بایگانی‌شده فقط خواندنی هستند"""
+    list_display = ['order_number', 'user', 'status', 'final_price', 'created_at', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    search_fields = ['order_number', 'user__username']
+    list_select_related = ['user']
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
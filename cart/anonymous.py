@@ -0,0 +1,180 @@
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+from products import inventory
+
+from products.models import Product, Color, Size
+from .checkout import price_items
+from .models import Cart, CartItem
+
+COOKIE_SALT = 'cart.anonymous'
+COOKIE_NAME = getattr(settings, 'ANONYMOUS_CART_COOKIE_NAME', 'cart')
+MAX_AGE = getattr(settings, 'ANONYMOUS_CART_MAX_AGE', 30 * 24 * 3600)
+MAX_ITEMS = getattr(settings, 'ANONYMOUS_CART_MAX_ITEMS', 50)
+
+
+class AnonymousCart:
+    """سبد خرید کاربر مهمان که به جای دیتابیس در یک کوکی امضاشده نگه داشته می‌شود
+
+    هر ردیف به صورت [product_id, color_id, size_id, quantity] ذخیره می‌شود و شناسه هر
+    آیتم کلید ثابت «محصول-رنگ-سایز» آن است (نه شماره ردیف) تا با حذف ردیف‌های دیگر عوض
+    نشود. ردیف Cart فقط هنگام ورود کاربر ساخته می‌شود.
+    token فقط برای نام‌گذاری رزروهای موجودی این سبد است.
+    """
+
+    is_anonymous = True
+
+    def __init__(self, lines=None, token=None):
+        self.lines = lines or []
+        self.token = token
+        self.modified = False
+        self._items = None
+
+    @classmethod
+    def from_request(cls, request):
+        cart = getattr(request, '_anonymous_cart', None)
+        if cart is None:
+            cart = request._anonymous_cart = cls(*cls._read(request))
+        return cart
+
+    @staticmethod
+    def _read(request):
+        value = request.COOKIES.get(COOKIE_NAME)
+        if not value:
+            return [], None
+        try:
+            data = signing.loads(value, salt=COOKIE_SALT, max_age=MAX_AGE)
+        except signing.BadSignature:
+            return [], None
+        token = None
+        if isinstance(data, dict):
+            token = data.get('t') if isinstance(data.get('t'), str) else None
+            data = data.get('l')
+        lines = []
+        for line in data if isinstance(data, list) else []:
+            if (isinstance(line, list) and len(line) == 4
+                    and all(part is None or type(part) is int for part in line)
+                    and line[0] and line[3] and line[3] > 0):
+                lines.append(line)
+        return lines[:MAX_ITEMS], token
+
+    @property
+    def reservation_owner(self):
+        if self.token is None:
+            self.token = uuid.uuid4().hex
+            self.modified = True
+        return f'guest:{self.token}'
+
+    def _changed(self):
+        self.modified = True
+        self._items = None
+
+    @staticmethod
+    def key(product_id, color_id=None, size_id=None):
+        """شناسه آیتم سبد مهمان؛ همان قالبی که مسیرهای cart/urls.py می‌پذیرند"""
+        return f'{product_id}-{color_id or 0}-{size_id or 0}'
+
+    def _line(self, item_id):
+        for line in self.lines:
+            if self.key(*line[:3]) == item_id:
+                return line
+        return None
+
+    def add(self, product, color=None, size=None, quantity=1):
+        """افزودن به سبد؛ اگر سبد به سقف ردیف‌ها رسیده باشد False برمی‌گرداند"""
+        key = [product.id, color.id if color else None, size.id if size else None]
+        for line in self.lines:
+            if line[:3] == key:
+                line[3] += quantity
+                self._changed()
+                return True
+        if len(self.lines) >= MAX_ITEMS:
+            return False
+        self.lines.append(key + [quantity])
+        self._changed()
+        return True
+
+    def line(self, item_id):
+        """(product_id, color_id, size_id, quantity) ردیف یا None"""
+        line = self._line(item_id)
+        return tuple(line) if line else None
+
+    def update(self, item_id, quantity):
+        line = self._line(item_id)
+        if line is None:
+            return False
+        line[3] = quantity
+        self._changed()
+        return True
+
+    def remove(self, item_id):
+        line = self._line(item_id)
+        if line is None:
+            return False
+        self.lines.remove(line)
+        self._changed()
+        return True
+
+    def clear(self):
+        self.lines = []
+        self._changed()
+
+    def items(self):
+        """آیتم‌ها به صورت CartItem ذخیره‌نشده؛ ردیف‌های محصولات حذف‌شده نادیده گرفته می‌شوند"""
+        if self._items is None:
+            products = Product.objects.in_bulk({line[0] for line in self.lines})
+            colors = Color.objects.in_bulk({line[1] for line in self.lines if line[1]})
+            sizes = Size.objects.in_bulk({line[2] for line in self.lines if line[2]})
+            self._items = []
+            for product_id, color_id, size_id, quantity in self.lines:
+                if product_id not in products:
+                    continue
+                self._items.append(CartItem(
+                    id=self.key(product_id, color_id, size_id),
+                    product=products[product_id],
+                    color=colors.get(color_id),
+                    size=sizes.get(size_id),
+                    quantity=quantity,
+                ))
+        return self._items
+
+    def count(self):
+        return len(self.lines)
+
+    def totals(self):
+        """جمع‌ها از همان محصولاتی که items() خوانده است تا با قیمت ردیف‌ها یکی باشند"""
+        return price_items(self.items())[1]
+
+    def transfer(self, user):
+        """انتقال آیتم‌ها به سبد دیتابیسی کاربر هنگام ورود و خالی کردن کوکی"""
+        items = self.items()
+        if not items:
+            if self.lines:
+                self.clear()
+            return None
+        cart = Cart.objects.filter(user=user).order_by('-created_at').first() or Cart.objects.create(user=user)
+        cart.add_lines([(item.product_id, item.color_id, item.size_id, item.quantity) for item in items])
+        if self.token:
+            inventory.transfer(self.reservation_owner, cart.reservation_owner)
+        self.clear()
+        return cart
+
+    def save(self, response):
+        """نوشتن تغییرات در کوکی پاسخ"""
+        if not self.modified:
+            return response
+        if self.lines:
+            response.set_cookie(
+                COOKIE_NAME,
+                signing.dumps({'t': self.token, 'l': self.lines}, salt=COOKIE_SALT, compress=True),
+                max_age=MAX_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite='Lax')
+        self.modified = False
+        return response
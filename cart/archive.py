@@ -0,0 +1,104 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatusEvent
+
+# فقط سفارش‌هایی که وضعیتشان دیگر تغییر نمی‌کند بایگانی می‌شوند
+ARCHIVE_STATUSES = ('DELIVERED', 'CANCELED')
+AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+
+
+def find_order(order_number, user):
+    """سفارش کاربر با شماره آن؛ اگر در جدول فعال نباشد از بایگانی خوانده می‌شود
+
+    سفارش بایگانی‌شده همان فیلدها و orderitems را دارد و در قالب‌ها و فاکتور مثل
+    سفارش عادی کار می‌کند. اگر در هیچ‌کدام نباشد Http404.
+    """
+    order = Order.objects.filter(order_number=order_number, user=user).first()
+    if order is None:
+        order = ArchivedOrder.objects.filter(order_number=order_number, user=user).first()
+    if order is None:
+        raise Http404('سفارش پیدا نشد.')
+    return order
+
+
+def candidates(cutoff, limit):
+    """شناسه سفارش‌های نهایی که پیش از cutoff تغییر نکرده‌اند (از ایندکس status و updated_at)"""
+    return list(
+        Order.objects.filter(status__in=ARCHIVE_STATUSES, updated_at__lt=cutoff)
+        .order_by('updated_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def _columns(source, target):
+    """ستون‌های مشترک دو جدول به ترتیب مدل مقصد"""
+    source_columns = {field.column for field in source._meta.concrete_fields}
+    return [field.column for field in target._meta.concrete_fields if field.column in source_columns]
+
+
+def archive_batch(order_ids, cutoff):
+    """انتقال یک دسته سفارش و آیتم‌هایشان به جدول‌های بایگانی در یک تراکنش کوتاه
+
+    با INSERT ... SELECT و DELETE مستقیم انجام می‌شود؛ سیگنال حذف سفارش اجرا نمی‌شود
+    چون سفارش بایگانی‌شده همچنان در جدول‌های تجمیعی فروش و شمارنده‌های هدر حساب است.
+    وضعیت و زمان دوباره داخل تراکنش بررسی می‌شود. خروجی (تعداد سفارش، تعداد آیتم).
+    """
+    if not order_ids:
+        return 0, 0
+    quote = connection.ops.quote_name
+    orders_table = quote(Order._meta.db_table)
+    items_table = quote(OrderItem._meta.db_table)
+    events_table = quote(OrderStatusEvent._meta.db_table)
+    archived_orders_table = quote(ArchivedOrder._meta.db_table)
+    archived_items_table = quote(ArchivedOrderItem._meta.db_table)
+    order_columns = ', '.join(quote(column) for column in _columns(Order, ArchivedOrder))
+    item_columns = ', '.join(quote(column) for column in _columns(OrderItem, ArchivedOrderItem))
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    statuses = ', '.join(['%s'] * len(ARCHIVE_STATUSES))
+    archived_at = ArchivedOrder._meta.get_field('archived_at').get_db_prep_save(timezone.now(), connection)
+    cutoff = Order._meta.get_field('updated_at').get_db_prep_save(cutoff, connection)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {archived_orders_table} ({order_columns}, {quote('archived_at')}) "
+            f"SELECT {order_columns}, %s FROM {orders_table} "
+            f"WHERE id IN ({placeholders}) AND status IN ({statuses}) AND updated_at < %s",
+            [archived_at, *order_ids, *ARCHIVE_STATUSES, cutoff],
+        )
+        if not cursor.rowcount:
+            return 0, 0
+        moved = f"SELECT id FROM {archived_orders_table} WHERE id IN ({placeholders})"
+        cursor.execute(
+            f"INSERT INTO {archived_items_table} ({item_columns}) "
+            f"SELECT {item_columns} FROM {items_table} WHERE order_id IN ({moved})",
+            order_ids,
+        )
+        items = cursor.rowcount
+        cursor.execute(f"DELETE FROM {items_table} WHERE order_id IN ({moved})", order_ids)
+        cursor.execute(f"DELETE FROM {events_table} WHERE order_id IN ({moved})", order_ids)
+        cursor.execute(f"DELETE FROM {orders_table} WHERE id IN ({moved})", order_ids)
+        orders = cursor.rowcount
+    return orders, items
+
+
+def archive(days=AFTER_DAYS, batch_size=1000, pause=0.0):
+    """بایگانی دسته‌ای همه سفارش‌های نهایی قدیمی‌تر از days روز؛ خروجی (تعداد سفارش، تعداد آیتم)"""
+    cutoff = timezone.now() - timedelta(days=days)
+    orders = items = 0
+    while True:
+        order_ids = candidates(cutoff, batch_size)
+        if not order_ids:
+            break
+        batch_orders, batch_items = archive_batch(order_ids, cutoff)
+        orders += batch_orders
+        items += batch_items
+        if len(order_ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return orders, items
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .anonymous import AnonymousCart
+from .models import ArchivedOrder, CartItem, Order, Favorite
+
+TIMEOUT = getattr(settings, 'HEADER_BADGES_TIMEOUT', 300)
+
+
+def cache_key(user_id):
+    return f'cart:badges:{user_id}'
+
+
+def counts(request):
+    """تعداد آیتم‌های سبد، سفارش‌ها و علاقه‌مندی‌ها برای هدر
+
+    برای کاربر لاگین‌کرده از کش خوانده می‌شود و فقط در صورت نبودن در کش کوئری می‌زند؛
+    سبد مهمان از کوکی شمرده می‌شود و هیچ کوئری ندارد.
+    """
+    if not request.user.is_authenticated:
+        return {'cart_count': AnonymousCart.from_request(request).count(), 'order_count': 0, 'wishlist_count': 0}
+    key = cache_key(request.user.pk)
+    result = cache.get(key)
+    if result is None:
+        result = {
+            'cart_count': CartItem.objects.filter(cart__user=request.user).count(),
+            'order_count': (
+                Order.objects.filter(user=request.user).exclude(order_number='').count()
+                + ArchivedOrder.objects.filter(user=request.user).count()
+            ),
+            'wishlist_count': Favorite.objects.filter(user=request.user).count(),
+        }
+        cache.set(key, result, TIMEOUT)
+    return result
+
+
+def invalidate(user_id):
+    """حذف شمارنده‌های کاربر از کش پس از commit تراکنش جاری"""
+    if user_id is not None:
+        transaction.on_commit(lambda: cache.delete(cache_key(user_id)))
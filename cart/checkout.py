@@ -0,0 +1,74 @@
+from django.db import connection, transaction
+
+from products import inventory, prices, recommendations, sales
+
+from . import invoices, rollups
+from .models import CartItem, Order, OrderItem, OrderStatusEvent
+
+
+def price_items(items):
+    """قیمت‌گذاری یک‌باره آیتم‌های سبد با قیمت‌هایی که همراه آیتم‌ها از دیتابیس خوانده شده‌اند
+
+    خروجی (قیمت هر ردیف، جمع‌ها)؛ مبلغ سفارش با همان قیمت‌هایی که ردیف‌ها نشان می‌دهند
+    و در لحظه پرداخت خوانده شده‌اند حساب می‌شود.
+    """
+    table = {item.product_id: (item.product.price, item.product.discount_price) for item in items}
+    lines = [(item.product_id, item.quantity) for item in items]
+    priced = prices.price_lines(lines, table)
+    return priced, prices.summarize(priced)
+
+
+def _delete_cart(cart):
+    """حذف آیتم‌ها با یک DELETE و سپس خود سبد
+
+    سیگنال تک‌تک آیتم‌ها اجرا نمی‌شود؛ سیگنال حذف Cart نشان‌های هدر کاربر را بی‌اعتبار می‌کند.
+    """
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE cart_id = %s", [cart.pk])
+    cart.delete()
+
+
+def place_order(cart, items, user, address, payment_method='آنلاین'):
+    """تبدیل سبد به سفارش در یک تراکنش با تعداد کوئری ثابت
+
+    موجودی کسر می‌شود، سفارش و همه آیتم‌ها با bulk_create ثبت می‌شوند، فروش در دفتر
+    فروش و جدول‌های تجمیعی و جفت محصولات در ماتریس پیشنهادها ثبت و در پایان سبد حذف
+    می‌شود. هر خطا (از جمله inventory.OutOfStock) کل تراکنش را برمی‌گرداند.
+    """
+    priced, totals = price_items(items)
+    with transaction.atomic():
+        inventory.commit(
+            cart.reservation_owner,
+            [(item.product_id, item.color_id, item.size_id, item.quantity) for item in items],
+        )
+        order = Order.objects.create(
+            user=user,
+            address=address,
+            total_price=totals['total_price'],
+            total_discount=totals['total_discount'],
+            final_price=totals['final_price'],
+            shipping_cost=0,
+            status='PENDING',
+            payment_method=payment_method,
+        )
+        OrderStatusEvent.objects.create(order=order, status=order.status)
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                color_id=item.color_id,
+                size_id=item.size_id,
+                quantity=item.quantity,
+                unit_price=item.product.discount_price or item.product.price,
+                discount=line.discount / item.quantity if item.quantity else 0,
+            )
+            for item, line in zip(items, priced)
+        ])
+        sales.record((item.product_id, item.quantity) for item in items)
+        rollups.record(order, order_items)
+        recommendations.record_order(order, [item.product_id for item in items])
+        _delete_cart(cart)
+        # فاکتور بعد از commit در پس‌زمینه ساخته می‌شود تا اولین دانلود منتظر wkhtmltopdf نماند
+        invoices.schedule_on_commit(order)
+    return order
@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+
+WORKERS = getattr(settings, 'INVOICE_WORKERS', 2)
+WAIT = getattr(settings, 'INVOICE_WAIT', 10)
+DIRECTORY = os.path.join(settings.MEDIA_ROOT, 'invoices')
+
+_lock = threading.Lock()
+_pending = {}
+_executor = None
+
+
+class InvoiceNotReady(Exception):
+    """فاکتور هنوز در صف ساخت است"""
+
+
+def path_for(order):
+    """مسیر فایل PDF هر نسخه از سفارش؛ با هر تغییر سفارش (updated_at) نسخه جدید ساخته می‌شود"""
+    version = int(order.updated_at.timestamp() * 1_000_000)
+    return os.path.join(DIRECTORY, f'{order.order_number}-{version}.pdf')
+
+
+def _render(html, path, order_number):
+    """اجرای wkhtmltopdf در یکی از نخ‌های پس‌زمینه و جایگزینی نسخه‌های قدیمی"""
+    import pdfkit
+
+    os.makedirs(DIRECTORY, exist_ok=True)
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        pdfkit.from_string(html, temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    prefix = f'{order_number}-'
+    for name in os.listdir(DIRECTORY):
+        old = os.path.join(DIRECTORY, name)
+        if name.startswith(prefix) and name.endswith('.pdf') and old != path:
+            os.remove(old)
+    return path
+
+
+def _forget(path):
+    with _lock:
+        _pending.pop(path, None)
+
+
+def schedule(order):
+    """قرار دادن ساخت فاکتور در صف اگر این نسخه هنوز ساخته نشده باشد؛ خروجی Future یا None
+
+    HTML در نخ فراخوان (که اتصال دیتابیس دارد) رندر می‌شود و فقط تبدیل به PDF به نخ‌های
+    پس‌زمینه سپرده می‌شود. درخواست‌های همزمان برای یک نسخه یک کار مشترک دارند.
+    """
+    global _executor
+    path = path_for(order)
+    if os.path.exists(path):
+        return None
+    with _lock:
+        future = _pending.get(path)
+        if future is not None:
+            return future
+    order_items = order.orderitems.select_related('product', 'color', 'size')
+    html = render_to_string('cart/invoice.html', {'order': order, 'order_items': order_items})
+    with _lock:
+        future = _pending.get(path)
+        if future is None:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='invoice')
+            future = _pending[path] = _executor.submit(_render, html, path, order.order_number)
+            future.add_done_callback(lambda done: _forget(path))
+    return future
+
+
+def schedule_on_commit(order):
+    transaction.on_commit(lambda: schedule(order))
+
+
+def get(order, wait=WAIT):
+    """مسیر PDF آماده سفارش؛ اگر تا wait ثانیه آماده نشود InvoiceNotReady
+
+    خطای ساخت PDF (مثلاً نبود wkhtmltopdf) همان‌طور بالا می‌رود.
+    """
+    future = schedule(order)
+    if future is not None:
+        try:
+            future.result(timeout=wait)
+        except TimeoutError:
+            raise InvoiceNotReady(order.order_number)
+    return path_for(order)
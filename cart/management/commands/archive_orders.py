@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart import archive
+
+
+class Command(BaseCommand):
+    help = "انتقال دسته‌ای سفارش‌های تحویل‌شده و لغوشده قدیمی به جدول‌های بایگانی"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.AFTER_DAYS,
+                            help="سفارش‌هایی که این تعداد روز تغییر نکرده‌اند بایگانی می‌شوند")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="مکث بین دسته‌ها (ثانیه) تا نوشتن‌های دیگر منتظر نمانند")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        orders, items = archive.archive(days=options['days'], batch_size=options['batch_size'], pause=options['sleep'])
+        elapsed = time.perf_counter() - started
+        rate = orders / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{orders} orders and {items} items archived in {elapsed:.2f}s ({rate:,.0f} orders/s)"
+        ))
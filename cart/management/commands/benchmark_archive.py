@@ -0,0 +1,110 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cart import archive, rollups
+from cart.models import Order, OrderItem
+from cart.order_numbers import ulid
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "سنجش مسیرهای پرتکرار سفارش (فهرست، شمارش وضعیت‌ها، داشبورد) پیش و پس از بایگانی تاریخچه بزرگ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200000, help="تعداد سفارش مصنوعی")
+        parser.add_argument('--old', type=float, default=0.9, help="سهم سفارش‌های نهایی قدیمی که بایگانی می‌شوند")
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20, help="تعداد اجرای هر مسیر")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            user = self._generate(tag, options)
+            client = Client()
+            client.force_login(user)
+            url = reverse('cart:orders')
+            paths = [
+                ('orders page', lambda: client.get(url)),
+                ('orders page ?status=PENDING', lambda: client.get(url, {'status': 'PENDING'})),
+                ('status counts', lambda: dict(
+                    Order.objects.filter(user=user).order_by().values_list('status').annotate(count=Count('id'))
+                )),
+                ('all PENDING count', lambda: Order.objects.filter(status='PENDING').count()),
+                ('dashboard', lambda: rollups.dashboard()),
+            ]
+            before = {label: self._time(run, options['repeat']) for label, run in paths}
+
+            started = time.perf_counter()
+            orders, items = archive.archive(days=archive.AFTER_DAYS, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"archived {orders} orders and {items} items in {elapsed:.2f}s, "
+                f"{Order.objects.count()} orders left in the hot table"
+            )
+
+            after = {label: self._time(run, options['repeat']) for label, run in paths}
+            for label, _ in paths:
+                self.stdout.write(
+                    f"{label}: median {before[label][0]:.2f}ms -> {after[label][0]:.2f}ms, "
+                    f"{before[label][1]} -> {after[label][1]} queries"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write("benchmark data rolled back")
+
+    def _generate(self, tag, options):
+        """سفارش‌های مصنوعی با دو آیتم؛ سهم --old تحویل‌شده یا لغوشده و قدیمی‌تر از مهلت بایگانی"""
+        started = time.perf_counter()
+        users = User.objects.bulk_create([User(username=f'benchmark-{tag}-{index}') for index in range(options['users'])])
+        products = Product.objects.bulk_create([
+            Product(name=f'benchmark {index}', slug=f'benchmark-{tag}-{index}', price=1000) for index in range(50)
+        ])
+        total, old = options['orders'], int(options['orders'] * options['old'])
+        hot_statuses = ['PENDING', 'SHIPPED', 'DELIVERED']
+        for offset in range(0, total, options['batch_size']):
+            orders = Order.objects.bulk_create([
+                Order(
+                    user=users[index % len(users)],
+                    order_number=ulid(),
+                    total_price=2000,
+                    final_price=2000,
+                    status=('CANCELED' if index % 10 == 0 else 'DELIVERED') if index < old else hot_statuses[index % 3],
+                )
+                for index in range(offset, min(offset + options['batch_size'], total))
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=products[(order.pk + shift) % len(products)], unit_price=1000)
+                for order in orders
+                for shift in (0, 7)
+            ])
+            if offset < old:
+                last_old = orders[min(old - offset, len(orders)) - 1].pk
+                stamp = timezone.now() - timedelta(days=archive.AFTER_DAYS + 30)
+                Order.objects.filter(pk__gte=orders[0].pk, pk__lte=last_old).update(created_at=stamp, updated_at=stamp)
+        self.stdout.write(
+            f"generated {total} orders ({old} archivable) for {len(users)} users "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return users[0]
+
+    def _time(self, run, repeat):
+        """میانه زمان اجرا (میلی‌ثانیه) و تعداد کوئری یک اجرا"""
+        run()
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(captured)
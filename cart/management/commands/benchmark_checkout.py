@@ -0,0 +1,53 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from cart import checkout, pricing
+from cart.models import Address, Cart
+from products.models import Product, Stock
+
+
+class Command(BaseCommand):
+    help = "سنجش زمان و تعداد کوئری place_order برای سبدهای با اندازه مختلف (درون تراکنشی که برگردانده می‌شود)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100], help="تعداد ردیف هر سبد")
+        parser.add_argument('--repeat', type=int, default=20, help="تعداد پرداخت برای هر اندازه")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            user = User.objects.create(username=f'benchmark-{tag}')
+            address = Address.objects.create(
+                user=user, full_name='benchmark', phone_number='0', province='-', city='-', address='-', postal_code='0'
+            )
+            products = Product.objects.bulk_create([
+                Product(name=f'benchmark {index}', slug=f'benchmark-{tag}-{index}', price=1000 + index,
+                        discount_price=900 + index if index % 2 else None)
+                for index in range(max(options['lines']))
+            ])
+            Stock.objects.bulk_create([Stock(product=product, quantity=10 ** 6) for product in products])
+
+            for count in options['lines']:
+                timings, queries = [], set()
+                for _ in range(options['repeat']):
+                    cart = Cart.objects.create(user=user)
+                    cart.add_lines([(product.pk, None, None, 2) for product in products[:count]])
+                    items = list(pricing.cart_items(cart))
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        checkout.place_order(cart, items, user, address)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries.add(len(captured))
+                self.stdout.write(
+                    f"{count} lines: {'/'.join(str(number) for number in sorted(queries))} queries, "
+                    f"best {min(timings):.2f}ms, median {statistics.median(timings):.2f}ms "
+                    f"over {options['repeat']} checkouts"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write("benchmark data rolled back")
@@ -0,0 +1,109 @@
+import os
+import shutil
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from cart import invoices, rollups
+from cart.models import Order, OrderItem
+from cart.order_numbers import ulid
+from products.models import Product
+
+
+def _simulated(work):
+    """جایگزین wkhtmltopdf با کار ثابت در نخ پس‌زمینه، برای سنجش صف و نخ‌ها بدون باینری"""
+    def render(html, path, order_number):
+        time.sleep(work)
+        os.makedirs(invoices.DIRECTORY, exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(b'%PDF-1.4\n')
+        return path
+    return render
+
+
+class Command(BaseCommand):
+    help = "سنجش توان دانلود همزمان فاکتور از مسیر download_invoice و صف ساخت PDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=10, help="تعداد دانلود هر نخ")
+        parser.add_argument('--simulate-ms', type=float, default=None,
+                            help="به جای wkhtmltopdf هر PDF با این مقدار کار شبیه‌سازی شود")
+
+    def handle(self, *args, **options):
+        if options['simulate_ms'] is None and shutil.which('wkhtmltopdf') is None:
+            raise CommandError("wkhtmltopdf not found; install it or pass --simulate-ms")
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create(username=f'benchmark-{tag}')
+        product = Product.objects.create(name=f'benchmark {tag}', slug=f'benchmark-invoice-{tag}', price=1000)
+        orders = Order.objects.bulk_create([
+            Order(user=user, order_number=ulid(), total_price=2000, final_price=2000, status='DELIVERED')
+            for _ in range(options['threads'] * options['requests'])
+        ])
+        for order in orders:
+            # سهم سفارش‌ها ثبت می‌شود تا حذف آن‌ها در پایان جدول‌های تجمیعی را به هم نزند
+            rollups.record(order, OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=2, unit_price=1000)
+            ]))
+        render = invoices._render
+        if options['simulate_ms'] is not None:
+            invoices._render = _simulated(options['simulate_ms'] / 1000)
+        try:
+            numbers = [order.order_number for order in orders]
+            for label, pick in (
+                ('cold, distinct orders', lambda index, attempt: numbers[index * options['requests'] + attempt]),
+                ('cold, one shared order', lambda index, attempt: numbers[-1]),
+                ('warm, distinct orders', lambda index, attempt: numbers[index * options['requests'] + attempt]),
+            ):
+                served, failed, timings, elapsed = self._run(user, pick, options)
+                total = served + failed
+                self.stdout.write(
+                    f"{label}: {total} downloads in {elapsed:.2f}s ({total / elapsed:,.1f}/s), "
+                    f"served {served}, not ready or failed {failed}, "
+                    f"p50 {statistics.median(timings):.1f}ms, p95 {timings[int(len(timings) * 0.95) - 1]:.1f}ms"
+                )
+        finally:
+            invoices._render = render
+            for order in Order.objects.filter(user=user):
+                if os.path.exists(invoices.path_for(order)):
+                    os.remove(invoices.path_for(order))
+            user.delete()
+            product.delete()
+
+    def _run(self, user, pick, options):
+        """دانلود همزمان از چند نخ با اتصال و کلاینت جدا؛ خروجی (موفق، ناموفق، زمان‌ها، کل زمان)"""
+        results = [[0, 0, []] for _ in range(options['threads'])]
+        barrier = threading.Barrier(options['threads'])
+
+        def worker(index):
+            counts = results[index]
+            try:
+                client = Client()
+                client.force_login(user)
+                barrier.wait()
+                for attempt in range(options['requests']):
+                    url = reverse('cart:download_invoice', args=[pick(index, attempt)])
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    counts[2].append((time.perf_counter() - started) * 1000)
+                    counts[0 if response.status_code == 200 else 1] += 1
+                    response.close()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        timings = sorted(timing for counts in results for timing in counts[2])
+        return sum(counts[0] for counts in results), sum(counts[1] for counts in results), timings, elapsed
@@ -0,0 +1,79 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from cart.models import Cart
+from products.models import Product
+
+
+def _per_item(target, source):
+    """روش قدیمی: get_or_create و ذخیره برای هر آیتم سبد دیگر و سپس حذف آن"""
+    for item in source.cartitem_set.all():
+        cart_item, created = target.cartitem_set.get_or_create(
+            cart=target,
+            product=item.product,
+            color=item.color,
+            size=item.size,
+            defaults={'quantity': item.quantity}
+        )
+        if not created:
+            cart_item.quantity += item.quantity
+            cart_item.save()
+    source.delete()
+
+
+def _upsert(target, source):
+    target.merge_carts(source)
+
+
+class Command(BaseCommand):
+    help = "مقایسه ادغام سبد با یک upsert در برابر حلقه get_or_create روی هر آیتم (درون تراکنشی که برگردانده می‌شود)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100, help="تعداد آیتم هر سبد")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        count = options['items']
+        with transaction.atomic():
+            user = User.objects.create(username=f'benchmark-{tag}')
+            products = Product.objects.bulk_create([
+                Product(name=f'benchmark {index}', slug=f'benchmark-{tag}-{index}', price=1000)
+                for index in range(count * 3 // 2)
+            ])
+            # نیمی از آیتم‌های سبد دوم در سبد اول هم هستند و باید جمع شوند
+            target_lines = [(product.pk, None, None, 1) for product in products[:count]]
+            source_lines = [(product.pk, None, None, 2) for product in products[count // 2:count // 2 + count]]
+
+            results, report = {}, {}
+            for label, merge in (('per-item loop', _per_item), ('upsert', _upsert)):
+                timings, queries = [], 0
+                for _ in range(options['repeat']):
+                    target, source = Cart.objects.create(user=user), Cart.objects.create(user=user)
+                    target.add_lines(target_lines)
+                    source.add_lines(source_lines)
+                    connection.queries_log.clear()
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        merge(target, source)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries = len(captured)
+                    results[label] = sorted(target.cartitem_set.values_list('product_id', 'quantity'))
+                    target.delete()
+                report[label] = (statistics.median(timings), queries)
+            if results['per-item loop'] != results['upsert']:
+                raise CommandError("upsert merge differs from the per-item loop")
+            transaction.set_rollback(True)
+
+        loop, upsert = report['per-item loop'], report['upsert']
+        self.stdout.write(
+            f"merging two {count}-item carts: per-item loop median {loop[0]:.2f}ms ({loop[1]} queries), "
+            f"upsert median {upsert[0]:.2f}ms ({upsert[1]} queries), {loop[0] / upsert[0]:.1f}x, results identical"
+        )
+        self.stdout.write("benchmark data rolled back")
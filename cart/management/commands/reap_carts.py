@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = "حذف دسته‌ای سبدهای خرید مهمان که مدتی تغییر نکرده‌اند"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'CART_REAP_AFTER_DAYS', 30),
+                            help="سبدهایی که این تعداد روز تغییر نکرده‌اند حذف می‌شوند")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="مکث بین دسته‌ها (ثانیه) تا نوشتن‌های دیگر منتظر نمانند")
+
+    def delete_batch(self, cart_ids):
+        """حذف یک دسته با دو DELETE مستقیم در یک تراکنش کوتاه
+
+        سبدهای مهمان کاربر ندارند، پس سیگنال‌های حذف (شمارنده‌های هدر) لازم نیستند.
+        """
+        placeholders = ', '.join(['%s'] * len(cart_ids))
+        items_table = connection.ops.quote_name(CartItem._meta.db_table)
+        carts_table = connection.ops.quote_name(Cart._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {items_table} WHERE cart_id IN ({placeholders})", cart_ids)
+            items = cursor.rowcount
+            cursor.execute(f"DELETE FROM {carts_table} WHERE id IN ({placeholders}) AND user_id IS NULL", cart_ids)
+            carts = cursor.rowcount
+        return carts, items
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        started = time.perf_counter()
+        carts = items = 0
+        while True:
+            # از ایندکس جزئی updated_at روی سبدهای بدون کاربر استفاده می‌کند
+            cart_ids = list(
+                Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff)
+                .order_by('updated_at')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not cart_ids:
+                break
+            batch_carts, batch_items = self.delete_batch(cart_ids)
+            carts += batch_carts
+            items += batch_items
+            if len(cart_ids) < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        elapsed = time.perf_counter() - started
+        rate = (carts + items) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{carts} carts and {items} items removed in {elapsed:.2f}s ({rate:,.0f} rows/s)"
+        ))
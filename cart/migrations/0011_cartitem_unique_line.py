@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 16:15
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+import django.db.models.functions.comparison
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    # ردیف‌هایی که فقط در رنگ یا سایز خالی (NULL) تکراری بوده‌اند در یک ردیف جمع می‌شوند
+    CartItem = apps.get_model("cart", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart_id", "product_id", "color_id", "size_id")
+        .annotate(lines=Count("id"), keep=Min("id"), total=Sum("quantity"))
+        .filter(lines__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        lines = CartItem.objects.filter(
+            cart_id=row["cart_id"],
+            product_id=row["product_id"],
+            color_id=row["color_id"],
+            size_id=row["size_id"],
+        )
+        lines.exclude(id=row["keep"]).delete()
+        CartItem.objects.filter(id=row["keep"]).update(quantity=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0010_alter_order_order_number"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="cartitem",
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                models.F("cart"),
+                models.F("product"),
+                django.db.models.functions.comparison.Coalesce(
+                    "color", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce("size", models.Value(0)),
+                name="cart_cartitem_unique_line",
+            ),
+        ),
+    ]
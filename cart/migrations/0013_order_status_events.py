@@ -0,0 +1,91 @@
+# Generated by Django 4.2 on 2026-10-18 16:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def record_current_statuses(apps, schema_editor):
+    """یک رویداد برای وضعیت فعلی هر سفارش موجود، با زمان آخرین به‌روزرسانی آن"""
+    Order = apps.get_model("cart", "Order")
+    OrderStatusEvent = apps.get_model("cart", "OrderStatusEvent")
+    rows = Order.objects.order_by("id").values_list("id", "status")
+    batch = []
+    for order_id, status in rows.iterator(chunk_size=2000):
+        batch.append(OrderStatusEvent(order_id=order_id, status=status))
+        if len(batch) >= 2000:
+            OrderStatusEvent.objects.bulk_create(batch)
+            batch = []
+    OrderStatusEvent.objects.bulk_create(batch)
+    OrderStatusEvent.objects.update(
+        created_at=Subquery(
+            Order.objects.filter(pk=OuterRef("order_id")).values("updated_at")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0012_cart_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderStatusEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "در حال پردازش"),
+                            ("SHIPPED", "ارسال شده"),
+                            ("DELIVERED", "تحویل شده"),
+                            ("CANCELED", "لغو شده"),
+                        ],
+                        max_length=20,
+                        verbose_name="وضعیت",
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="توضیحات"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="زمان"),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_events",
+                        to="cart.order",
+                        verbose_name="سفارش",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "رویداد وضعیت سفارش",
+                "verbose_name_plural": "رویدادهای وضعیت سفارش",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="orderstatusevent",
+            index=models.Index(
+                fields=["order", "id"], name="cart_orderstatus_order_id"
+            ),
+        ),
+        migrations.RunPython(record_current_statuses, migrations.RunPython.noop),
+    ]
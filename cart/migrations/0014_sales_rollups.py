@@ -0,0 +1,181 @@
+# Generated by Django 4.2 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0013_order_status_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("total", "کل"),
+                            ("product", "محصول"),
+                            ("category", "دسته\u200cبندی"),
+                            ("brand", "برند"),
+                        ],
+                        max_length=10,
+                        verbose_name="بعد",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="مقدار بعد"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "در حال پردازش"),
+                            ("SHIPPED", "ارسال شده"),
+                            ("DELIVERED", "تحویل شده"),
+                            ("CANCELED", "لغو شده"),
+                        ],
+                        max_length=20,
+                        verbose_name="وضعیت سفارش",
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="مبلغ فروش",
+                    ),
+                ),
+                (
+                    "discount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=16, verbose_name="تخفیف"
+                    ),
+                ),
+                ("units", models.BigIntegerField(default=0, verbose_name="تعداد کالا")),
+                (
+                    "orders",
+                    models.BigIntegerField(default=0, verbose_name="تعداد سفارش"),
+                ),
+                ("period", models.DateField(verbose_name="روز")),
+            ],
+            options={
+                "verbose_name": "فروش روزانه",
+                "verbose_name_plural": "فروش روزانه",
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("total", "کل"),
+                            ("product", "محصول"),
+                            ("category", "دسته\u200cبندی"),
+                            ("brand", "برند"),
+                        ],
+                        max_length=10,
+                        verbose_name="بعد",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="مقدار بعد"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "در حال پردازش"),
+                            ("SHIPPED", "ارسال شده"),
+                            ("DELIVERED", "تحویل شده"),
+                            ("CANCELED", "لغو شده"),
+                        ],
+                        max_length=20,
+                        verbose_name="وضعیت سفارش",
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="مبلغ فروش",
+                    ),
+                ),
+                (
+                    "discount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=16, verbose_name="تخفیف"
+                    ),
+                ),
+                ("units", models.BigIntegerField(default=0, verbose_name="تعداد کالا")),
+                (
+                    "orders",
+                    models.BigIntegerField(default=0, verbose_name="تعداد سفارش"),
+                ),
+                ("period", models.DateTimeField(verbose_name="ساعت")),
+            ],
+            options={
+                "verbose_name": "فروش ساعتی",
+                "verbose_name_plural": "فروش ساعتی",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="hourlysales",
+            index=models.Index(
+                fields=["dimension", "period"], name="cart_hourlysales_dim_period"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="hourlysales",
+            constraint=models.UniqueConstraint(
+                fields=("period", "dimension", "key", "status"),
+                name="cart_hourlysales_unique",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailysales",
+            index=models.Index(
+                fields=["dimension", "period"], name="cart_dailysales_dim_period"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailysales",
+            constraint=models.UniqueConstraint(
+                fields=("period", "dimension", "key", "status"),
+                name="cart_dailysales_unique",
+            ),
+        ),
+    ]
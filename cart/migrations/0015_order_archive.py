@@ -0,0 +1,217 @@
+# Generated by Django 4.2 on 2026-10-18 16:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_stock"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("cart", "0014_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="شناسه"
+                    ),
+                ),
+                (
+                    "order_number",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="شماره سفارش"
+                    ),
+                ),
+                (
+                    "total_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="مبلغ کل"
+                    ),
+                ),
+                (
+                    "total_discount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="تخفیف کل",
+                    ),
+                ),
+                (
+                    "shipping_cost",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="هزینه ارسال",
+                    ),
+                ),
+                (
+                    "final_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="مبلغ نهایی"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "در حال پردازش"),
+                            ("SHIPPED", "ارسال شده"),
+                            ("DELIVERED", "تحویل شده"),
+                            ("CANCELED", "لغو شده"),
+                        ],
+                        max_length=20,
+                        verbose_name="وضعیت",
+                    ),
+                ),
+                (
+                    "shipping_method",
+                    models.CharField(max_length=50, verbose_name="روش ارسال"),
+                ),
+                (
+                    "delivery_time",
+                    models.CharField(max_length=50, verbose_name="زمان تحویل"),
+                ),
+                ("created_at", models.DateTimeField(verbose_name="تاریخ ایجاد")),
+                (
+                    "updated_at",
+                    models.DateTimeField(verbose_name="تاریخ به\u200cروزرسانی"),
+                ),
+                (
+                    "tracking_number",
+                    models.CharField(
+                        blank=True,
+                        max_length=50,
+                        null=True,
+                        verbose_name="شماره مرسوله",
+                    ),
+                ),
+                (
+                    "payment_method",
+                    models.CharField(max_length=50, verbose_name="روش پرداخت"),
+                ),
+                (
+                    "payment_transaction_id",
+                    models.CharField(
+                        blank=True,
+                        max_length=100,
+                        null=True,
+                        verbose_name="کد رهگیری پرداخت",
+                    ),
+                ),
+                ("archived_at", models.DateTimeField(verbose_name="تاریخ بایگانی")),
+            ],
+            options={
+                "verbose_name": "سفارش بایگانی\u200cشده",
+                "verbose_name_plural": "سفارشات بایگانی\u200cشده",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrderItem",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="شناسه"
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField(verbose_name="تعداد")),
+                (
+                    "unit_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="قیمت واحد"
+                    ),
+                ),
+                (
+                    "discount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=12, verbose_name="تخفیف"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "آیتم سفارش بایگانی\u200cشده",
+                "verbose_name_plural": "آیتم\u200cهای سفارش بایگانی\u200cشده",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "updated_at"], name="cart_order_status_updated"
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="color",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="products.color",
+                verbose_name="رنگ",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="order",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="orderitems",
+                to="cart.archivedorder",
+                verbose_name="سفارش",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="products.product",
+                verbose_name="محصول",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorderitem",
+            name="size",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="products.size",
+                verbose_name="سایز",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorder",
+            name="address",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="cart.address",
+                verbose_name="آدرس",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedorder",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="کاربر",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["user", "-created_at"], name="cart_archivedorder_user"
+            ),
+        ),
+    ]
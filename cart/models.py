@@ -1,8 +1,17 @@
-from django.db import models
+from django.db import models, connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from products.models import Product, Color, Size
-from django.utils import timezone
-import uuid
+from products import inventory
+from . import order_numbers, rollups, tracking
+
+# کلید یکتای هر ردیف سبد؛ رنگ و سایز خالی با صفر جایگزین می‌شوند تا NULL ها هم یکتا باشند
+CART_LINE_CONFLICT = "(cart_id, product_id, COALESCE(color_id, 0), COALESCE(size_id, 0))"
+
+def reservation_owner(cart_id):
+    """نام صاحب رزروهای موجودی یک سبد دیتابیسی"""
+    return f'cart:{cart_id}'
 
 class Cart(models.Model):
     user = models.ForeignKey(
@@ -30,24 +39,56 @@ class Cart(models.Model):
     class Meta:
         verbose_name = "سبد خرید"
         verbose_name_plural = "سبدهای خرید"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='cart_cart_user_created'),
+            models.Index(fields=['updated_at'], name='cart_cart_anonymous_updated', condition=models.Q(user__isnull=True)),
+        ]
 
     def __str__(self):
         return f"سبد خرید {self.id} - {'کاربر: ' + str(self.user) if self.user else 'جلسه: ' + self.session_id}"
 
-    def merge_carts(self, other_cart):
-        """ادغام سبدهای خرید برای کاربرانی که لاگین می‌کنند"""
-        for item in other_cart.cartitem_set.all():
-            cart_item, created = self.cartitem_set.get_or_create(
-                cart=self,
-                product=item.product,
-                color=item.color,
-                size=item.size,
-                defaults={'quantity': item.quantity}
-            )
-            if not created:
-                cart_item.quantity += item.quantity
-                cart_item.save()
-        other_cart.delete()
+    @property
+    def reservation_owner(self):
+        return reservation_owner(self.id)
+
+    def merge_carts(self, *other_carts):
+        """ادغام سبدهای دیگر در این سبد با یک INSERT ... SELECT ... ON CONFLICT و حذف آن‌ها"""
+        other_ids = [cart.id for cart in other_carts if cart.id != self.id]
+        if not other_ids:
+            return
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(other_ids))
+        sql = (
+            f"INSERT INTO {table} (cart_id, product_id, color_id, size_id, quantity) "
+            f"SELECT %s, product_id, color_id, size_id, SUM(quantity) FROM {table} "
+            f"WHERE cart_id IN ({placeholders}) GROUP BY product_id, color_id, size_id "
+            f"ON CONFLICT {CART_LINE_CONFLICT} DO UPDATE SET quantity = {table}.quantity + excluded.quantity"
+        )
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [self.id, *other_ids])
+            for cart_id in other_ids:
+                inventory.transfer(reservation_owner(cart_id), self.reservation_owner)
+            # آیتم‌های سبدهای ادغام‌شده با یک DELETE حذف می‌شوند تا سیگنال تک‌تک آن‌ها اجرا نشود؛
+            # سیگنال حذف و ذخیره خود سبدها نشان‌های هدر را بی‌اعتبار می‌کند
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE cart_id IN ({placeholders})", other_ids)
+            Cart.objects.filter(id__in=other_ids).delete()
+            self.save(update_fields=['updated_at'])
+
+    def add_lines(self, lines):
+        """افزودن ردیف‌های (product_id, color_id, size_id, quantity) با یک دستور upsert"""
+        if not lines:
+            return
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (cart_id, product_id, color_id, size_id, quantity) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT {CART_LINE_CONFLICT} DO UPDATE SET quantity = {table}.quantity + excluded.quantity"
+        )
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, [(self.id, *line) for line in lines])
+            self.save(update_fields=['updated_at'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(
@@ -83,7 +124,12 @@ class CartItem(models.Model):
     class Meta:
         verbose_name = "آیتم سبد خرید"
         verbose_name_plural = "آیتم‌های سبد خرید"
-        unique_together = ('cart', 'product', 'color', 'size')
+        constraints = [
+            models.UniqueConstraint(
+                F('cart'), F('product'), Coalesce('color', Value(0)), Coalesce('size', Value(0)),
+                name='cart_cartitem_unique_line',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - تعداد: {self.quantity}"
@@ -161,6 +207,8 @@ class Order(models.Model):
         ('DELIVERED', 'تحویل شده'),
         ('CANCELED', 'لغو شده'),
     )
+    # سفارش فعال؛ پیگیری و لغو فقط برای این سفارش‌ها ممکن است
+    is_archived = False
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -245,28 +293,36 @@ class Order(models.Model):
     class Meta:
         verbose_name = "سفارش"
         verbose_name_plural = "سفارشات"
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='cart_order_status_updated'),
+        ]
 
     def __str__(self):
         return f"سفارش {self.order_number} - {self.user.username}"
 
+    def change_status(self, status, description=''):
+        """تغییر وضعیت سفارش و ثبت آن در تاریخچه وضعیت‌ها
+
+        پس از commit شناسه آخرین رویداد در کش گذاشته می‌شود تا جریان‌های پیگیری
+        بدون کوئری زدن به جدول سفارش‌ها از تغییر باخبر شوند.
+        """
+        with transaction.atomic():
+            previous, self.status = self.status, status
+            self.save(update_fields=['status', 'updated_at'])
+            if previous != status:
+                rollups.move(self, previous)
+            event = OrderStatusEvent.objects.create(order=self, status=status, description=description)
+        tracking.notify(self.pk, event.pk)
+        return event
+
     def generate_order_number(self):
-        """تولید شماره سفارش منحصربه‌فرد با استفاده از UUID"""
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S%f')
-        uuid_suffix = str(uuid.uuid4()).replace('-', '')[:12]
-        order_number = f"ST-{timestamp}-{uuid_suffix}"
-        return order_number
+        """تولید شماره سفارش یکتا بدون مراجعه به دیتابیس (ORDER_NUMBER_GENERATOR)"""
+        return order_numbers.generate()
 
     def save(self, *args, **kwargs):
-        """تضمین اینکه order_number همیشه یونیک باشه"""
+        """سفارش با شماره نهایی خود در همان اولین INSERT ذخیره می‌شود"""
         if not self.order_number:
             self.order_number = self.generate_order_number()
-            counter = 1
-            while Order.objects.filter(order_number=self.order_number).exclude(id=self.id).exists():
-                uuid_suffix = str(uuid.uuid4()).replace('-', '')[:12]
-                self.order_number = f"ST-{timezone.now().strftime('%Y%m%d%H%M%S%f')}-{uuid_suffix}"
-                counter += 1
-                if counter > 10:
-                    raise ValueError("نمی‌توان شماره سفارش یونیک تولید کرد.")
         super().save(*args, **kwargs)
 
 class OrderItem(models.Model):
@@ -324,6 +380,273 @@ class OrderItem(models.Model):
         discount = self.discount if self.discount is not None else 0
         return self.quantity * (unit_price - discount)
 
+class OrderStatusEvent(models.Model):
+    """تاریخچه فقط‌افزودنی وضعیت‌های یک سفارش"""
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='status_events',
+        verbose_name="سفارش"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        verbose_name="وضعیت"
+    )
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="توضیحات"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="زمان"
+    )
+
+    class Meta:
+        verbose_name = "رویداد وضعیت سفارش"
+        verbose_name_plural = "رویدادهای وضعیت سفارش"
+        indexes = [
+            models.Index(fields=['order', 'id'], name='cart_orderstatus_order_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.order.order_number} - {self.get_status_display()}"
+
+class ArchivedOrder(models.Model):
+    """سفارش‌های قدیمی تحویل‌شده یا لغوشده که از جدول سفارش‌های فعال منتقل شده‌اند
+
+    شناسه و همه فیلدهای سفارش اصلی حفظ می‌شوند تا فاکتور و آدرس‌ها بدون تغییر کار کنند.
+    """
+    is_archived = True
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="شناسه"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="کاربر"
+    )
+    address = models.ForeignKey(
+        Address,
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name="آدرس"
+    )
+    order_number = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="شماره سفارش"
+    )
+    total_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="مبلغ کل"
+    )
+    total_discount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="تخفیف کل"
+    )
+    shipping_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="هزینه ارسال"
+    )
+    final_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="مبلغ نهایی"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        verbose_name="وضعیت"
+    )
+    shipping_method = models.CharField(
+        max_length=50,
+        verbose_name="روش ارسال"
+    )
+    delivery_time = models.CharField(
+        max_length=50,
+        verbose_name="زمان تحویل"
+    )
+    created_at = models.DateTimeField(
+        verbose_name="تاریخ ایجاد"
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="تاریخ به‌روزرسانی"
+    )
+    tracking_number = models.CharField(
+        max_length=50,
+        null=True,
+        blank=True,
+        verbose_name="شماره مرسوله"
+    )
+    payment_method = models.CharField(
+        max_length=50,
+        verbose_name="روش پرداخت"
+    )
+    payment_transaction_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name="کد رهگیری پرداخت"
+    )
+    archived_at = models.DateTimeField(
+        verbose_name="تاریخ بایگانی"
+    )
+
+    class Meta:
+        verbose_name = "سفارش بایگانی‌شده"
+        verbose_name_plural = "سفارشات بایگانی‌شده"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='cart_archivedorder_user'),
+        ]
+
+    def __str__(self):
+        return f"سفارش {self.order_number} - {self.user.username}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="شناسه"
+    )
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='orderitems',
+        verbose_name="سفارش"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name="محصول"
+    )
+    color = models.ForeignKey(
+        Color,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name="رنگ"
+    )
+    size = models.ForeignKey(
+        Size,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name="سایز"
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name="تعداد"
+    )
+    unit_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        verbose_name="قیمت واحد"
+    )
+    discount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="تخفیف"
+    )
+
+    class Meta:
+        verbose_name = "آیتم سفارش بایگانی‌شده"
+        verbose_name_plural = "آیتم‌های سفارش بایگانی‌شده"
+
+    def __str__(self):
+        return f"{self.product.name} - تعداد: {self.quantity}"
+
+    get_total_price = OrderItem.get_total_price
+
+class SalesRollup(models.Model):
+    """پایه جدول‌های تجمیعی فروش؛ هر ردیف جمع فروش یک بعد در یک بازه زمانی و یک وضعیت سفارش است"""
+    DIMENSION_CHOICES = (
+        ('total', 'کل'),
+        ('product', 'محصول'),
+        ('category', 'دسته‌بندی'),
+        ('brand', 'برند'),
+    )
+    dimension = models.CharField(
+        max_length=10,
+        choices=DIMENSION_CHOICES,
+        verbose_name="بعد"
+    )
+    key = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="مقدار بعد"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        verbose_name="وضعیت سفارش"
+    )
+    revenue = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="مبلغ فروش"
+    )
+    discount = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="تخفیف"
+    )
+    units = models.BigIntegerField(
+        default=0,
+        verbose_name="تعداد کالا"
+    )
+    orders = models.BigIntegerField(
+        default=0,
+        verbose_name="تعداد سفارش"
+    )
+
+    class Meta:
+        abstract = True
+
+class HourlySales(SalesRollup):
+    period = models.DateTimeField(
+        verbose_name="ساعت"
+    )
+
+    class Meta:
+        verbose_name = "فروش ساعتی"
+        verbose_name_plural = "فروش ساعتی"
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'dimension', 'key', 'status'], name='cart_hourlysales_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'period'], name='cart_hourlysales_dim_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.period:%Y-%m-%d %H}:00 - {self.get_dimension_display()} {self.key}"
+
+class DailySales(SalesRollup):
+    period = models.DateField(
+        verbose_name="روز"
+    )
+
+    class Meta:
+        verbose_name = "فروش روزانه"
+        verbose_name_plural = "فروش روزانه"
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'dimension', 'key', 'status'], name='cart_dailysales_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'period'], name='cart_dailysales_dim_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} - {self.get_dimension_display()} {self.key}"
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
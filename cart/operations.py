@@ -0,0 +1,93 @@
+from products import inventory, sales
+from products.models import Color, Size
+
+from .anonymous import AnonymousCart
+from .models import CartItem
+
+
+class CartError(Exception):
+    """خطای تغییر سبد که پیام آن مستقیماً به کاربر نمایش داده می‌شود"""
+
+    def __init__(self, message, status=400):
+        self.message = message
+        self.status = status
+        super().__init__(message)
+
+
+def parse_quantity(value, default=1):
+    try:
+        return int(value if value not in (None, '') else default)
+    except (TypeError, ValueError):
+        raise CartError('تعداد نامعتبر است.')
+
+
+def add_item(cart, product, color_hex=None, size_name=None, quantity=1):
+    """افزودن محصول به سبد همراه با رزرو موجودی؛ خروجی آیتم سبد"""
+    if not product.stock_status:
+        raise CartError('محصول ناموجود است.', status=409)
+    if quantity < 1:
+        raise CartError('تعداد باید حداقل ۱ باشد.')
+
+    color = Color.objects.filter(hex_code=color_hex, product=product).first() if color_hex else None
+    size = Size.objects.filter(name=size_name, product=product, available=True).first() if size_name else None
+    if not color and product.colors.exists():
+        raise CartError('لطفاً رنگ محصول را انتخاب کنید.')
+    if not size and product.sizes.exists():
+        raise CartError('لطفاً سایز محصول را انتخاب کنید.')
+
+    owner = cart.reservation_owner
+    key = (product.id, color and color.id, size and size.id)
+    try:
+        inventory.reserve(owner, *key, quantity)
+    except inventory.OutOfStock:
+        raise CartError('موجودی این محصول کافی نیست.', status=409)
+    if isinstance(cart, AnonymousCart):
+        if not cart.add(product, color, size, quantity):
+            inventory.release(owner, *key, quantity)
+            raise CartError('سبد خرید مهمان پر است؛ لطفاً وارد حساب خود شوید.', status=409)
+        item = next(item for item in cart.items() if (item.product_id, item.color_id, item.size_id) == key)
+    else:
+        item, created = CartItem.objects.get_or_create(
+            cart=cart, product=product, color=color, size=size, defaults={'quantity': quantity}
+        )
+        if not created:
+            item.quantity += quantity
+            item.save(update_fields=['quantity'])
+    sales.record([(product.id, quantity)])
+    return item
+
+
+def set_quantity(cart, item_id, quantity):
+    """تغییر تعداد یک آیتم سبد (تعداد صفر یعنی حذف)؛ خروجی آیتم یا None اگر حذف شده باشد"""
+    quantity = max(quantity, 0)
+    if isinstance(cart, AnonymousCart):
+        line = cart.line(item_id)
+        if line is None:
+            raise CartError('آیتم سبد خرید پیدا نشد.', status=404)
+        product_id, color_id, size_id, current = line
+    else:
+        item = None
+        if isinstance(item_id, int):
+            item = CartItem.objects.filter(cart=cart, id=item_id).select_related('product', 'color', 'size').first()
+        if item is None:
+            raise CartError('آیتم سبد خرید پیدا نشد.', status=404)
+        product_id, color_id, size_id, current = item.product_id, item.color_id, item.size_id, item.quantity
+
+    try:
+        inventory.adjust(cart.reservation_owner, product_id, color_id, size_id, quantity - current)
+    except inventory.OutOfStock:
+        raise CartError('موجودی این محصول کافی نیست.', status=409)
+    sales.record([(product_id, quantity - current)])
+
+    if isinstance(cart, AnonymousCart):
+        if quantity < 1:
+            cart.remove(item_id)
+            return None
+        cart.update(item_id, quantity)
+        return next((item for item in cart.items() if item.id == item_id), None)
+    if quantity < 1:
+        item.delete()
+        return None
+    item.quantity = quantity
+    item.save(update_fields=['quantity'])
+    return item
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .anonymous import AnonymousCart
+from .models import CartItem
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+# معادل CartItem.get_total_price و CartItem.get_discount در SQL
+LINE_TOTAL = ExpressionWrapper(
+    Coalesce('product__discount_price', 'product__price', ZERO) * F('quantity'),
+    output_field=MONEY,
+)
+LINE_DISCOUNT = Case(
+    When(
+        product__discount_price__lt=F('product__price'),
+        then=ExpressionWrapper(
+            (F('product__price') - F('product__discount_price')) * F('quantity'),
+            output_field=MONEY,
+        ),
+    ),
+    default=ZERO,
+    output_field=MONEY,
+)
+
+
+def cart_items(cart):
+    """آیتم‌های سبد همراه با محصول، رنگ و سایز در یک کوئری"""
+    if isinstance(cart, AnonymousCart):
+        return cart.items()
+    return cart.cartitem_set.select_related('product', 'color', 'size').order_by('id')
+
+
+def _totals(total_price, total_discount):
+    total_price = total_price or Decimal('0')
+    total_discount = total_discount or Decimal('0')
+    return {
+        'total_price': total_price,
+        'total_discount': total_discount,
+        'final_price': total_price - total_discount,
+    }
+
+
+def cart_totals(cart):
+    """جمع کل، تخفیف و مبلغ نهایی سبد با یک کوئری تجمیعی"""
+    if isinstance(cart, AnonymousCart):
+        return cart.totals()
+    result = CartItem.objects.filter(cart=cart).aggregate(
+        total_price=Sum(LINE_TOTAL),
+        total_discount=Sum(LINE_DISCOUNT),
+    )
+    return _totals(result['total_price'], result['total_discount'])
+
+
+def totals_by_cart(carts):
+    """مبلغ نهایی چند سبد با یک کوئری GROUP BY؛ سبدهای خالی در خروجی نیستند"""
+    rows = (
+        CartItem.objects.filter(cart__in=carts)
+        .values('cart_id')
+        .annotate(total_price=Sum(LINE_TOTAL), total_discount=Sum(LINE_DISCOUNT))
+        .order_by()
+    )
+    return {
+        row['cart_id']: _totals(row['total_price'], row['total_discount'])['final_price']
+        for row in rows
+    }
@@ -0,0 +1,267 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from . import models
+
+# وضعیت‌هایی که در گزارش‌ها فروش حساب می‌شوند؛ سفارش‌های لغوشده جدا نمایش داده می‌شوند
+SOLD_STATUSES = ('PENDING', 'SHIPPED', 'DELIVERED')
+# بعدهای تجمیع و فیلد متناظر در OrderItem (بعد total یک ردیف برای کل فروش است)
+DIMENSIONS = (
+    ('total', None),
+    ('product', 'product_id'),
+    ('category', 'product__category'),
+    ('brand', 'product__brand'),
+)
+COLUMNS = ('period', 'dimension', 'key', 'status', 'revenue', 'discount', 'units', 'orders')
+UPSERT_BATCH = 100
+
+
+def _periods(created_at):
+    """ساعت و روز سفارش به وقت محلی؛ همان مقادیری که TruncHour و TruncDate در دیتابیس می‌دهند"""
+    local = timezone.localtime(created_at)
+    return (
+        (models.HourlySales, local.replace(minute=0, second=0, microsecond=0)),
+        (models.DailySales, local.date()),
+    )
+
+
+def _rows(entries):
+    """سهم سفارش‌ها در جدول‌های تجمیعی
+
+    entries شامل (created_at, status, lines, sign) است و هر ردیف lines به شکل
+    (product_id, category, brand, quantity, unit_price, discount). خروجی
+    {(model, period, dimension, key, status): [revenue, discount, units, orders]}.
+    """
+    rows = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0, 0])
+    for created_at, status, lines, sign in entries:
+        periods = _periods(created_at)
+        counted = set()
+        for product_id, category, brand, quantity, unit_price, discount in lines:
+            revenue = sign * quantity * (unit_price or 0)
+            line_discount = sign * quantity * (discount or 0)
+            for dimension, key in (('total', ''), ('product', str(product_id)), ('category', category), ('brand', brand)):
+                new_order = (dimension, key) not in counted
+                counted.add((dimension, key))
+                for model, period in periods:
+                    row = rows[model, period, dimension, key, status]
+                    row[0] += revenue
+                    row[1] += line_discount
+                    row[2] += sign * quantity
+                    if new_order:
+                        row[3] += sign
+    return rows
+
+
+def _lines(order_ids, item_model=None):
+    """ردیف‌های سفارش‌ها (OrderItem یا ArchivedOrderItem) با دسته‌بندی و برند محصول در یک کوئری"""
+    lines = defaultdict(list)
+    items = (item_model or models.OrderItem).objects.filter(order_id__in=order_ids).values_list(
+        'order_id', 'product_id', 'product__category', 'product__brand', 'quantity', 'unit_price', 'discount'
+    )
+    for order_id, *line in items:
+        lines[order_id].append(line)
+    return lines
+
+
+def _upsert(model, rows):
+    """افزودن مقادیر به ردیف‌های موجود با INSERT ... ON CONFLICT DO UPDATE (جمع با مقدار فعلی)"""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in COLUMNS]
+    columns = ', '.join(quote(field.column) for field in fields)
+    conflict = ', '.join(quote(name) for name in COLUMNS[:4])
+    updates = ', '.join(f"{quote(name)} = {table}.{quote(name)} + excluded.{quote(name)}" for name in COLUMNS[4:])
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            values = ', '.join([f"({', '.join(['%s'] * len(fields))})"] * len(batch))
+            params = [field.get_db_prep_save(value, connection) for row in batch for field, value in zip(fields, row)]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {values} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+                params,
+            )
+
+
+def apply(rows):
+    """اعمال خروجی _rows روی جدول‌های ساعتی و روزانه"""
+    grouped = defaultdict(list)
+    for (model, period, dimension, key, status), values in rows.items():
+        if any(values):
+            grouped[model].append((period, dimension, key, status, *values))
+    with transaction.atomic():
+        for model, model_rows in grouped.items():
+            _upsert(model, model_rows)
+
+
+def record(order, items):
+    """ثبت سفارش تازه از روی OrderItem هایی که محصولشان در حافظه است؛ بدون کوئری خواندن"""
+    lines = [
+        (item.product_id, item.product.category, item.product.brand, item.quantity, item.unit_price, item.discount)
+        for item in items
+    ]
+    apply(_rows([(order.created_at, order.status, lines, 1)]))
+
+
+def move(order, previous_status):
+    """انتقال سهم سفارش از وضعیت قبلی به وضعیت فعلی (مثلاً لغو سفارش)"""
+    lines = _lines([order.pk])[order.pk]
+    apply(_rows([
+        (order.created_at, previous_status, lines, -1),
+        (order.created_at, order.status, lines, 1),
+    ]))
+
+
+def snapshot(order_ids):
+    """سهم فعلی سفارش‌ها بر اساس آنچه در دیتابیس است (برای ویرایش‌هایی که چند جای سفارش را تغییر می‌دهند)"""
+    lines = _lines(order_ids)
+    orders = models.Order.objects.filter(pk__in=order_ids).values_list('pk', 'created_at', 'status')
+    return _rows([(created_at, status, lines[pk], 1) for pk, created_at, status in orders])
+
+
+def replace(before, after):
+    """جایگزینی سهم قبلی سفارش‌ها (خروجی snapshot) با سهم جدید"""
+    rows = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0, 0])
+    for source, sign in ((before, -1), (after, 1)):
+        for row_key, values in source.items():
+            rows[row_key] = [total + sign * value for total, value in zip(rows[row_key], values)]
+    apply(rows)
+
+
+def remove(orders):
+    """کم کردن سهم سفارش‌ها (فعال یا بایگانی‌شده، از یک نوع) پیش از حذف آن‌ها"""
+    orders = list(orders)
+    if not orders:
+        return
+    lines = _lines([order.pk for order in orders], orders[0].orderitems.model)
+    apply(_rows([(order.created_at, order.status, lines[order.pk], -1) for order in orders]))
+
+
+def rebuild(since=None, batch_size=2000):
+    """ساخت دوباره جدول‌ها از روی آیتم‌های سفارش‌های فعال و بایگانی‌شده با کوئری‌های GROUP BY
+
+    همه کار در یک تراکنش انجام می‌شود. اگر since (تاریخ) داده شود فقط ردیف‌های آن روز
+    به بعد پاک و دوباره ساخته می‌شوند. خروجی تعداد ردیف‌های گروه‌بندی‌شده برای هر جدول است.
+    """
+    start = None
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+    money = DecimalField(max_digits=16, decimal_places=2)
+    created = {}
+    with transaction.atomic():
+        for model, trunc, period_start in (
+            (models.HourlySales, TruncHour, start),
+            (models.DailySales, TruncDate, since),
+        ):
+            existing = model.objects.all()
+            if since is not None:
+                existing = existing.filter(period__gte=period_start)
+            existing.delete()
+            created[model] = 0
+            # سفارش‌های فعال و بایگانی‌شده جدا هستند، پس جمع دو منبع با upsert درست است
+            for item_model in (models.OrderItem, models.ArchivedOrderItem):
+                items = item_model.objects.all()
+                if start is not None:
+                    items = items.filter(order__created_at__gte=start)
+                for dimension, field in DIMENSIONS:
+                    group = ['period', 'order__status'] + ([field] if field else [])
+                    rows = (
+                        items.annotate(period=trunc('order__created_at'))
+                        .values(*group)
+                        .annotate(
+                            revenue=Sum(F('quantity') * F('unit_price'), output_field=money),
+                            line_discount=Sum(F('quantity') * F('discount'), output_field=money),
+                            units=Sum('quantity'),
+                            orders=Count('order_id', distinct=True),
+                        )
+                        .order_by()
+                    )
+                    batch = []
+                    for row in rows.iterator(chunk_size=batch_size):
+                        batch.append((
+                            row['period'],
+                            dimension,
+                            str(row[field]) if field else '',
+                            row['order__status'],
+                            row['revenue'] or 0,
+                            row['line_discount'] or 0,
+                            row['units'] or 0,
+                            row['orders'],
+                        ))
+                        if len(batch) >= batch_size:
+                            _upsert(model, batch)
+                            created[model] += len(batch)
+                            batch = []
+                    _upsert(model, batch)
+                    created[model] += len(batch)
+    return created
+
+
+def _top(dimension, start, limit):
+    return list(
+        models.DailySales.objects.filter(dimension=dimension, period__gte=start, status__in=SOLD_STATUSES)
+        .values('key')
+        .annotate(revenue=Sum('revenue'), units=Sum('units'), orders=Sum('orders'))
+        .order_by('-revenue')[:limit]
+    )
+
+
+def dashboard(days=30, top=5):
+    """شاخص‌های داشبورد مدیریت از جدول‌های تجمیعی با چند خواندن کوچک ایندکس‌دار
+
+    مبلغ فروش جمع تعداد × قیمت واحد ردیف‌هاست (بدون هزینه ارسال) و سفارش‌های لغوشده
+    در فروش حساب نمی‌شوند.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    daily = {start + timedelta(days=offset): {'revenue': Decimal('0'), 'orders': 0, 'units': 0} for offset in range(days)}
+    canceled = 0
+    totals = models.DailySales.objects.filter(dimension='total', period__gte=start).values_list(
+        'period', 'status', 'revenue', 'orders', 'units'
+    )
+    for period, status, revenue, orders, units in totals:
+        if status == 'CANCELED':
+            canceled += orders
+        elif period in daily:
+            daily[period]['revenue'] += revenue
+            daily[period]['orders'] += orders
+            daily[period]['units'] += units
+    revenue = sum((day['revenue'] for day in daily.values()), Decimal('0'))
+    orders = sum(day['orders'] for day in daily.values())
+
+    since = timezone.localtime().replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+    hourly = list(
+        models.HourlySales.objects.filter(dimension='total', period__gte=since, status__in=SOLD_STATUSES)
+        .values('period')
+        .annotate(revenue=Sum('revenue'), orders=Sum('orders'))
+        .order_by('period')
+    )
+
+    top_products = _top('product', start, top)
+    names = dict(
+        models.Product.objects.filter(pk__in=[int(row['key']) for row in top_products]).values_list('pk', 'name')
+    )
+    for row in top_products:
+        row['name'] = names.get(int(row['key']), row['key'])
+
+    return {
+        'days': days,
+        'today': daily[today],
+        'revenue': revenue,
+        'orders': orders,
+        'units': sum(day['units'] for day in daily.values()),
+        'average_order': revenue / orders if orders else Decimal('0'),
+        'canceled': canceled,
+        'cancel_rate': canceled * 100 / (orders + canceled) if orders + canceled else 0,
+        'daily': [{'day': day, **values} for day, values in daily.items()],
+        'hourly': hourly,
+        'top_products': top_products,
+        'top_categories': _top('category', start, top),
+        'top_brands': _top('brand', start, top),
+    }
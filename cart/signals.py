@@ -0,0 +1,76 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from products.models import Color, Product, Size
+
+from . import badges, rollups
+from .models import ArchivedOrder, Cart, CartItem, Order, Favorite
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=ArchivedOrder)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_user_badges(sender, instance, **kwargs):
+    badges.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_badges(sender, instance, update_fields=None, **kwargs):
+    """سبدهای مهمان قدیمی کاربر ندارند؛ اگر سبد در حافظه نباشد فقط user_id آن خوانده می‌شود"""
+    if update_fields is not None and set(update_fields) == {'quantity'}:
+        # نشان هدر تعداد ردیف‌هاست و با تغییر تعداد یک ردیف عوض نمی‌شود
+        return
+    if CartItem.cart.is_cached(instance):
+        user_id = instance.cart.user_id
+    else:
+        user_id = Cart.objects.filter(pk=instance.cart_id).values_list('user_id', flat=True).first()
+    badges.invalidate(user_id)
+
+
+@receiver(pre_delete, sender=Order)
+@receiver(pre_delete, sender=ArchivedOrder)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """سهم سفارش پیش از حذف ردیف‌هایش (CASCADE) از جدول‌های تجمیعی فروش کم می‌شود"""
+    rollups.remove([instance])
+
+
+@receiver(pre_delete, sender=Color)
+@receiver(pre_delete, sender=Size)
+def merge_cart_lines(sender, instance, origin=None, **kwargs):
+    """ادغام ردیف‌های سبدی که با SET_NULL شدن رنگ یا سایز حذف‌شده با ردیف دیگری یکی می‌شوند
+
+    کلید یکتای ردیف سبد COALESCE(color, 0) و COALESCE(size, 0) است؛ پس ردیف رنگی و ردیف
+    بدون رنگ یک محصول پس از حذف رنگ تکراری می‌شوند. تعداد ردیف رنگی به ردیف دیگر اضافه و
+    خودش حذف می‌شود؛ بقیه ردیف‌ها مثل قبل با SET_NULL بی‌رنگ (یا بی‌سایز) می‌شوند.
+    """
+    if getattr(origin, 'model', type(origin)) is Product:
+        # با حذف محصول ردیف‌های سبد آن هم CASCADE حذف می‌شوند
+        return
+    field = 'color' if sender is Color else 'size'
+    other = 'size' if field == 'color' else 'color'
+    lines = list(CartItem.objects.filter(**{field: instance}).values_list('id', 'cart_id', 'product_id', f'{other}_id', 'quantity'))
+    if not lines:
+        return
+    targets = {
+        (item.cart_id, item.product_id, getattr(item, f'{other}_id')): item
+        for item in CartItem.objects.filter(
+            **{f'{field}__isnull': True},
+            cart_id__in={line[1] for line in lines},
+            product_id__in={line[2] for line in lines},
+        )
+    }
+    merged, updated = [], []
+    for line_id, cart_id, product_id, other_id, quantity in lines:
+        target = targets.get((cart_id, product_id, other_id))
+        if target is not None:
+            target.quantity += quantity
+            merged.append(line_id)
+            updated.append(target)
+    if merged:
+        CartItem.objects.bulk_update(updated, ['quantity'])
+        CartItem.objects.filter(id__in=merged).delete()
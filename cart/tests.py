@@ -1,3 +1,106 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from products.models import Color, Product, Size
+
+from . import order_numbers
+from .models import Cart, CartItem
+
+# زمان ثابت (نانوثانیه) برای شبیه‌سازی شماره‌های یک میلی‌ثانیه
+NOW_NS = 1_700_000_000_123_456_789
+
+
+def _ms(number):
+    """بخش زمان ULID (۱۰ کاراکتر اول بعد از پیشوند) بر حسب میلی‌ثانیه"""
+    value = 0
+    for char in number[len(order_numbers.PREFIX):][:10]:
+        value = value * 32 + order_numbers.ALPHABET.index(char)
+    return value
+
+
+class OrderNumberTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(order_numbers._state, {'ms': -1, 'random': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertStrictlyIncreasing(self, numbers):
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for previous, current in zip(numbers, numbers[1:]):
+            self.assertLess(previous, current)
+
+    def test_large_batch_unique_and_increasing(self):
+        numbers = [order_numbers.ulid() for _ in range(200_000)]
+        self.assertStrictlyIncreasing(numbers)
+        self.assertTrue(all(len(number) == len(order_numbers.PREFIX) + 26 for number in numbers))
+
+    def test_same_millisecond_increments(self):
+        with mock.patch('cart.order_numbers.time.time_ns', return_value=NOW_NS):
+            numbers = [order_numbers.ulid() for _ in range(1000)]
+        self.assertStrictlyIncreasing(numbers)
+        self.assertEqual({_ms(number) for number in numbers}, {NOW_NS // 1_000_000})
+
+    def test_random_overflow_moves_to_next_millisecond(self):
+        with mock.patch('cart.order_numbers.time.time_ns', return_value=NOW_NS):
+            first = order_numbers.ulid()
+            order_numbers._state['random'] = (1 << 80) - 1
+            second = order_numbers.ulid()
+        self.assertLess(first, second)
+        self.assertEqual(_ms(second), NOW_NS // 1_000_000 + 1)
+
+    def test_clock_going_backwards(self):
+        with mock.patch('cart.order_numbers.time.time_ns', return_value=NOW_NS):
+            first = order_numbers.ulid()
+        with mock.patch('cart.order_numbers.time.time_ns', return_value=NOW_NS - 5_000_000_000):
+            second = order_numbers.ulid()
+        self.assertLess(first, second)
+
+    def test_threads_never_collide(self):
+        results = [[] for _ in range(8)]
+
+        def worker(out):
+            out.extend(order_numbers.ulid() for _ in range(5000))
+
+        threads = [threading.Thread(target=worker, args=(out,)) for out in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        numbers = [number for out in results for number in out]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for out in results:
+            self.assertStrictlyIncreasing(out)
+
+
+class CartLineDeleteTests(TestCase):
+    """حذف رنگ یا سایزی که ردیف سبد به آن اشاره دارد نباید کلید یکتای ردیف را بشکند"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='p', slug='p', price=100)
+        self.color = Color.objects.create(product=self.product, name='red', hex_code='#ff0000')
+        self.size = Size.objects.create(product=self.product, name='M')
+        self.cart = Cart.objects.create(user=User.objects.create_user('u'))
+        self.other_cart = Cart.objects.create(user=User.objects.create_user('o'))
+
+    def lines(self, cart):
+        return list(cart.cartitem_set.values_list('color_id', 'size_id', 'quantity'))
+
+    def test_deleting_color_merges_colliding_lines(self):
+        self.cart.add_lines([(self.product.id, self.color.id, None, 2), (self.product.id, None, None, 3)])
+        self.other_cart.add_lines([(self.product.id, self.color.id, None, 4)])
+        self.color.delete()
+        self.assertEqual(self.lines(self.cart), [(None, None, 5)])
+        self.assertEqual(self.lines(self.other_cart), [(None, None, 4)])
+
+    def test_deleting_size_merges_colliding_lines(self):
+        self.cart.add_lines([
+            (self.product.id, self.color.id, self.size.id, 1),
+            (self.product.id, self.color.id, None, 2),
+            (self.product.id, None, self.size.id, 6),
+        ])
+        Size.objects.filter(pk=self.size.pk).delete()
+        self.assertCountEqual(self.lines(self.cart), [(None, None, 6), (self.color.id, None, 3)])
+        self.assertEqual(CartItem.objects.count(), 2)
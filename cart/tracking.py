@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import models
+
+POLL_INTERVAL = getattr(settings, 'ORDER_EVENTS_POLL_INTERVAL', 2)
+STREAM_DURATION = getattr(settings, 'ORDER_EVENTS_STREAM_DURATION', 300)
+# زیر WSGI جریان باز نمی‌ماند و صفحه پیگیری با این فاصله درخواست شرطی (ETag) می‌فرستد
+PAGE_POLL_INTERVAL = getattr(settings, 'ORDER_TRACKING_POLL_INTERVAL', 30)
+HEARTBEAT = 15
+RETRY_MS = 5000
+FINAL_STATUSES = ('DELIVERED', 'CANCELED')
+
+
+def cache_key(order_id):
+    return f'cart:order-events:{order_id}'
+
+
+def notify(order_id, event_id):
+    """اعلام آخرین رویداد سفارش به جریان‌های باز از طریق کش، پس از commit"""
+    transaction.on_commit(lambda: cache.set(cache_key(order_id), event_id, None))
+
+
+def _events_after(order_id, last_id):
+    return list(
+        models.OrderStatusEvent.objects.filter(order_id=order_id, id__gt=last_id or 0).order_by('id')
+    )
+
+
+def _latest_id(order_id):
+    """شناسه آخرین رویداد از دیتابیس؛ فقط وقتی کلید کش وجود ندارد صدا زده می‌شود"""
+    latest = (
+        models.OrderStatusEvent.objects.filter(order_id=order_id)
+        .order_by('-id')
+        .values_list('id', flat=True)
+        .first()
+    ) or 0
+    cache.add(cache_key(order_id), latest, None)
+    return latest
+
+
+def format_event(event):
+    data = json.dumps({
+        'status': event.status,
+        'status_display': event.get_status_display(),
+        'description': event.description,
+        'created_at': event.created_at.isoformat(),
+    }, ensure_ascii=False)
+    return f'id: {event.pk}\nevent: status\ndata: {data}\n\n'
+
+
+async def stream(order_id, last_id=0, status=None):
+    """جریان Server-Sent Events تغییرات وضعیت یک سفارش
+
+    اول رویدادهای بعد از last_id (هدر Last-Event-ID) فرستاده می‌شوند. سپس هر
+    POLL_INTERVAL ثانیه فقط کلید کش سفارش خوانده می‌شود و تنها وقتی شناسه آن جلو
+    رفته باشد رویدادهای جدید از دیتابیس خوانده می‌شوند. جریان با رسیدن سفارش به
+    وضعیت نهایی یا پس از STREAM_DURATION ثانیه بسته می‌شود و مرورگر دوباره وصل می‌شود.
+    status وضعیت فعلی سفارش است.
+    """
+    yield f'retry: {RETRY_MS}\n\n'
+    for event in await sync_to_async(_events_after)(order_id, last_id):
+        last_id, status = event.pk, event.status
+        yield format_event(event)
+    if status in FINAL_STATUSES:
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_DURATION
+    quiet = 0
+    while loop.time() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        latest = await cache.aget(cache_key(order_id))
+        if latest is None:
+            latest = await sync_to_async(_latest_id)(order_id)
+        if latest > (last_id or 0):
+            quiet = 0
+            for event in await sync_to_async(_events_after)(order_id, last_id):
+                last_id, status = event.pk, event.status
+                yield format_event(event)
+            if status in FINAL_STATUSES:
+                return
+        else:
+            quiet += POLL_INTERVAL
+            if quiet >= HEARTBEAT:
+                quiet = 0
+                yield ': ping\n\n'
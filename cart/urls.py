@@ -1,13 +1,31 @@
-from django.urls import path
+from django.urls import path, register_converter
 from . import views
 
+
+class ItemIdConverter:
+    """شناسه آیتم سبد دیتابیسی (عدد) یا کلید آیتم سبد مهمان (محصول-رنگ-سایز)"""
+    regex = r'[0-9]+(?:-[0-9]+-[0-9]+)?'
+
+    def to_python(self, value):
+        return int(value) if value.isdigit() else value
+
+    def to_url(self, value):
+        return str(value)
+
+
+register_converter(ItemIdConverter, 'cart_item')
+
 app_name = 'cart'
 
 urlpatterns = [
     path('cart/', views.cart_detail, name='cart_detail'),
     path('add/<slug:slug>/', views.add_to_cart, name='add_to_cart'),
-    path('update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
-    path('remove/<int:item_id>/', views.remove_cart_item, name='remove_cart_item'),
+    path('update/<cart_item:item_id>/', views.update_cart_item, name='update_cart_item'),
+    path('remove/<cart_item:item_id>/', views.remove_cart_item, name='remove_cart_item'),
+    path('api/cart/', views.api_cart, name='api_cart'),
+    path('api/add/<slug:slug>/', views.api_add_to_cart, name='api_add_to_cart'),
+    path('api/update/<cart_item:item_id>/', views.api_update_cart_item, name='api_update_cart_item'),
+    path('api/remove/<cart_item:item_id>/', views.api_remove_cart_item, name='api_remove_cart_item'),
     path('address/', views.address, name='address'),
     path('payment/', views.payment, name='payment'),
     path('orders/', views.orders, name='orders'),
@@ -15,6 +33,7 @@ urlpatterns = [
     path('cancel/<str:order_number>/', views.cancel_order, name='cancel_order'),
     path('reorder/<str:order_number>/', views.reorder, name='reorder'),
     path('track/<str:order_number>/', views.track_order, name='track_order'),
+    path('track/<str:order_number>/events/', views.order_events, name='order_events'),
     path('invoice/<str:order_number>/', views.download_invoice, name='download_invoice'),
     path('admincart/', views.admin_cart_management, name='admin_cart_management'),
 ]
\ No newline at end of file
@@ -1,133 +1,166 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Sum, Q
-from .models import Cart, CartItem, Address, Order, OrderItem
-from products.models import Product, Color, Size
+from django.db.models import Count, Prefetch, Sum, Q
+from .models import Cart, CartItem, Address, ArchivedOrder, ArchivedOrderItem, Order, OrderItem, reservation_owner
+from products.models import Product
+from products.pagination import KeysetPaginator
+from products import sales, inventory
+from . import archive, badges, checkout, invoices, operations, pricing, tracking
+from .anonymous import AnonymousCart
 from django.utils import timezone
-from django.http import HttpResponse
-import pdfkit
-from django.template.loader import render_to_string
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
 from django import forms
 
+ORDERS_PER_PAGE = 10
+
 def is_admin(user):
     return user.is_staff or user.is_superuser
 
 def get_or_merge_cart(request):
-    """گرفتن یا ادغام سبد خرید برای کاربر یا جلسه"""
-    if request.user.is_authenticated:
-        carts = Cart.objects.filter(user=request.user)
-        if carts.count() > 1:
-            latest_cart = carts.latest('created_at')
-            for cart in carts.exclude(id=latest_cart.id):
-                latest_cart.merge_carts(cart)
-            cart = latest_cart
-        else:
-            cart, _ = Cart.objects.get_or_create(user=request.user)
-    else:
-        session_id = request.session.session_key or request.session.create()
-        carts = Cart.objects.filter(session_id=session_id)
-        if carts.count() > 1:
-            latest_cart = carts.latest('created_at')
-            for cart in carts.exclude(id=latest_cart.id):
-                latest_cart.merge_carts(cart)
-            cart = latest_cart
-        else:
-            cart, _ = Cart.objects.get_or_create(session_id=session_id)
-    return cart
+    """گرفتن یا ادغام سبد خرید کاربر؛ کاربران مهمان سبد کوکی دارند"""
+    if not request.user.is_authenticated:
+        return AnonymousCart.from_request(request)
+    carts = list(Cart.objects.filter(user=request.user).order_by('-created_at', '-id'))
+    if not carts:
+        return Cart.objects.create(user=request.user)
+    if len(carts) > 1:
+        carts[0].merge_carts(*carts[1:])
+    return carts[0]
 
 def cart_detail(request):
     cart = get_or_merge_cart(request)
-    cart_items = cart.cartitem_set.all()
-    total_price = sum(item.get_total_price() for item in cart_items)
-    total_discount = sum(item.get_discount() for item in cart_items)
-    final_price = total_price - total_discount
     context = {
-        'cart_items': cart_items,
-        'total_price': total_price,
-        'total_discount': total_discount,
-        'final_price': final_price,
+        'cart_items': pricing.cart_items(cart),
+        **pricing.cart_totals(cart),
     }
     return render(request, 'cart/cart.html', context)
 
 def add_to_cart(request, slug):
     if request.method == 'POST':
         product = get_object_or_404(Product, slug=slug)
-        if not product.stock_status:
-            messages.error(request, 'محصول ناموجود است.')
-            return redirect(product.get_absolute_url())
-        
-        color_hex = request.POST.get('color')
-        size_name = request.POST.get('size')
+        cart = get_or_merge_cart(request)
         try:
-            quantity = int(request.POST.get('quantity', 1))
-            if quantity < 1:
-                messages.error(request, 'تعداد باید حداقل ۱ باشد.')
-                return redirect(product.get_absolute_url())
-        except ValueError:
-            messages.error(request, 'تعداد نامعتبر است.')
+            quantity = operations.parse_quantity(request.POST.get('quantity'))
+            operations.add_item(cart, product, request.POST.get('color'), request.POST.get('size'), quantity)
+        except operations.CartError as error:
+            messages.error(request, error.message)
             return redirect(product.get_absolute_url())
-
-        color = Color.objects.filter(hex_code=color_hex, product=product).first() if color_hex else None
-        size = Size.objects.filter(name=size_name, product=product, available=True).first() if size_name else None
-
-        if not color and product.colors.exists():
-            messages.error(request, 'لطفاً رنگ محصول را انتخاب کنید.')
-            return redirect(product.get_absolute_url())
-        if not size and product.sizes.exists():
-            messages.error(request, 'لطفاً سایز محصول را انتخاب کنید.')
-            return redirect(product.get_absolute_url())
-
-        cart = get_or_merge_cart(request)
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            color=color,
-            size=size,
-            defaults={'quantity': quantity}
-        )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-
-        product.sales_count += quantity
-        product.save()
         messages.success(request, f'{product.name} به سبد خرید اضافه شد.')
-        return redirect('cart:cart_detail')
+        response = redirect('cart:cart_detail')
+        if isinstance(cart, AnonymousCart):
+            cart.save(response)
+        return response
     return redirect('products:product_list')
 
-@login_required
+def _adjust_item_reservation(cart_item, quantity):
+    """هم‌گام کردن رزرو موجودی با تعداد جدید یک آیتم سبد دیتابیسی"""
+    inventory.adjust(
+        reservation_owner(cart_item.cart_id),
+        cart_item.product_id,
+        cart_item.color_id,
+        cart_item.size_id,
+        quantity - cart_item.quantity,
+    )
+
+def _set_quantity(request, item_id, quantity):
+    cart = get_or_merge_cart(request)
+    try:
+        item = operations.set_quantity(cart, item_id, quantity)
+    except operations.CartError as error:
+        messages.error(request, error.message)
+    else:
+        messages.success(request, 'تعداد محصول به‌روزرسانی شد.' if item else 'محصول از سبد خرید حذف شد.')
+    response = redirect('cart:cart_detail')
+    if isinstance(cart, AnonymousCart):
+        cart.save(response)
+    return response
+
 def update_cart_item(request, item_id):
     if request.method == 'POST':
-        cart_item = get_object_or_404(CartItem, id=item_id)
         try:
-            quantity = int(request.POST.get('quantity', 1))
-            product = cart_item.product
-            if quantity < 1:
-                product.sales_count -= cart_item.quantity
-                product.save()
-                cart_item.delete()
-                messages.success(request, 'محصول از سبد خرید حذف شد.')
-            else:
-                product.sales_count += (quantity - cart_item.quantity)
-                product.save()
-                cart_item.quantity = quantity
-                cart_item.save()
-                messages.success(request, 'تعداد محصول به‌روزرسانی شد.')
-        except ValueError:
-            messages.error(request, 'تعداد نامعتبر است.')
-        return redirect('cart:cart_detail')
+            quantity = operations.parse_quantity(request.POST.get('quantity'))
+        except operations.CartError as error:
+            messages.error(request, error.message)
+            return redirect('cart:cart_detail')
+        return _set_quantity(request, item_id, quantity)
     return redirect('cart:cart_detail')
 
-@login_required
 def remove_cart_item(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id)
-    product = cart_item.product
-    product.sales_count -= cart_item.quantity
-    product.save()
-    cart_item.delete()
-    messages.success(request, 'محصول از سبد خرید حذف شد.')
-    return redirect('cart:cart_detail')
+    return _set_quantity(request, item_id, 0)
+
+def _line_data(item):
+    product = item.product
+    return {
+        'id': item.id,
+        'product_id': product.id,
+        'name': product.name,
+        'url': product.get_absolute_url(),
+        'image': product.main_image.url if product.main_image else None,
+        'color': item.color.name if item.color else None,
+        'size': item.size.name if item.size else None,
+        'quantity': item.quantity,
+        'price': product.price,
+        'discount_price': product.discount_price,
+        'total_price': item.get_total_price(),
+        'discount': item.get_discount(),
+    }
+
+def _cart_response(request, cart, data=None):
+    """پاسخ JSON به همراه جمع‌های جدید سبد و تعداد آیتم‌ها برای نشان هدر"""
+    data = dict(data or {})
+    data.update(pricing.cart_totals(cart))
+    data['count'] = badges.counts(request)['cart_count']
+    response = JsonResponse(data)
+    if isinstance(cart, AnonymousCart):
+        cart.save(response)
+    return response
+
+def _cart_error(error):
+    return JsonResponse({'error': error.message}, status=error.status)
+
+def _changed_line(item_id, item):
+    if item is not None:
+        return {'item': _line_data(item)}
+    return {'removed': item_id}
+
+def api_cart(request):
+    """مینی‌سبد: همه آیتم‌ها و جمع‌ها در یک پاسخ"""
+    cart = get_or_merge_cart(request)
+    return _cart_response(request, cart, {'items': [_line_data(item) for item in pricing.cart_items(cart)]})
+
+@require_POST
+def api_add_to_cart(request, slug):
+    product = get_object_or_404(Product, slug=slug)
+    cart = get_or_merge_cart(request)
+    try:
+        quantity = operations.parse_quantity(request.POST.get('quantity'))
+        item = operations.add_item(cart, product, request.POST.get('color'), request.POST.get('size'), quantity)
+    except operations.CartError as error:
+        return _cart_error(error)
+    return _cart_response(request, cart, {'item': _line_data(item)})
+
+@require_POST
+def api_update_cart_item(request, item_id):
+    cart = get_or_merge_cart(request)
+    try:
+        quantity = operations.parse_quantity(request.POST.get('quantity'))
+        item = operations.set_quantity(cart, item_id, quantity)
+    except operations.CartError as error:
+        return _cart_error(error)
+    return _cart_response(request, cart, _changed_line(item_id, item))
+
+@require_POST
+def api_remove_cart_item(request, item_id):
+    cart = get_or_merge_cart(request)
+    try:
+        operations.set_quantity(cart, item_id, 0)
+    except operations.CartError as error:
+        return _cart_error(error)
+    return _cart_response(request, cart, _changed_line(item_id, None))
 
 @login_required
 def address(request):
@@ -161,14 +194,11 @@ def address(request):
 @login_required
 def payment(request):
     cart = get_or_merge_cart(request)
-    cart_items = cart.cartitem_set.all()
+    cart_items = list(pricing.cart_items(cart))
     if not cart_items:
         messages.error(request, 'سبد خرید شما خالی است. لطفاً محصولی اضافه کنید.')
         return redirect('cart:cart_detail')
 
-    total_price = sum(item.get_total_price() for item in cart_items)
-    total_discount = sum(item.get_discount() for item in cart_items)
-    final_price = total_price - total_discount
     address = Address.objects.filter(user=request.user, is_default=True).first() or Address.objects.filter(user=request.user).last()
     if not address:
         messages.error(request, 'لطفاً ابتدا یک آدرس ثبت کنید.')
@@ -176,43 +206,20 @@ def payment(request):
 
     if request.method == 'POST':
         try:
-            order = Order.objects.create(
-                user=request.user,
-                address=address,
-                total_price=total_price,
-                total_discount=total_discount,
-                final_price=final_price,
-                shipping_cost=0,
-                status='PENDING',
-                payment_method='آنلاین'
-            )
-            order.order_number = f"{order.id:06d}"
-            order.save()
-
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    color=item.color,
-                    size=item.size,
-                    quantity=item.quantity,
-                    unit_price=item.product.discount_price or item.product.price,
-                    discount=item.get_discount() / item.quantity if item.quantity else 0
-                )
-                item.product.sales_count += item.quantity
-                item.product.save()
-            cart.delete()
+            checkout.place_order(cart, cart_items, request.user, address)
             messages.success(request, 'سفارش شما با موفقیت ثبت شد.')
             return redirect('cart:orders')
+        except inventory.OutOfStock as e:
+            product = next((item.product for item in cart_items if item.product_id == e.product_id), None)
+            messages.error(request, f'موجودی «{product.name if product else e.product_id}» کافی نیست.')
+            return redirect('cart:cart_detail')
         except Exception as e:
             messages.error(request, f'خطا در ثبت سفارش: {str(e)}')
             return redirect('cart:payment')
 
     context = {
         'cart_items': cart_items,
-        'total_price': total_price,
-        'total_discount': total_discount,
-        'final_price': final_price,
+        **checkout.price_items(cart_items)[1],
         'address': address,
     }
     return render(request, 'cart/payment.html', context)
@@ -224,19 +231,33 @@ def orders(request):
         user=request.user,
         order_number__isnull=False,
         order_number__gt=''
-    ).order_by('-created_at')
-    if status in ['PENDING', 'SHIPPED', 'DELIVERED', 'CANCELED']:
-        orders = orders.filter(status=status)
-    
+    )
+    # تعداد سفارش‌های هر تب با یک GROUP BY؛ سفارش‌های بایگانی‌شده تب جدا دارند
+    status_counts = dict.fromkeys(['PENDING', 'SHIPPED', 'DELIVERED', 'CANCELED'], 0)
+    status_counts.update(orders.order_by().values_list('status').annotate(count=Count('id')))
+    status_counts['all'] = sum(status_counts.values())
+    archived = ArchivedOrder.objects.filter(user=request.user)
+    status_counts['ARCHIVED'] = archived.count()
+    if status == 'ARCHIVED':
+        orders, items = archived, ArchivedOrderItem.objects
+    else:
+        if status in ['PENDING', 'SHIPPED', 'DELIVERED', 'CANCELED']:
+            orders = orders.filter(status=status)
+        items = OrderItem.objects
+    orders = orders.prefetch_related(
+        Prefetch('orderitems', queryset=items.select_related('product', 'color', 'size').order_by('id'))
+    )
+
     context = {
-        'orders': orders,
+        'orders': KeysetPaginator(orders, ORDERS_PER_PAGE, 'newest').page(request.GET.get('cursor')),
         'current_status': status,
+        'status_counts': status_counts,
     }
     return render(request, 'cart/orders.html', context)
 
 @login_required
 def order_detail(request, order_number):
-    order = get_object_or_404(Order, order_number=order_number, user=request.user)
+    order = archive.find_order(order_number, request.user)
     context = {
         'order': order,
         'order_items': order.orderitems.all(),
@@ -247,8 +268,7 @@ def order_detail(request, order_number):
 def cancel_order(request, order_number):
     order = get_object_or_404(Order, order_number=order_number, user=request.user)
     if order.status in ['PENDING', 'SHIPPED']:
-        order.status = 'CANCELED'
-        order.save()
+        order.change_status('CANCELED', 'لغو توسط مشتری')
         messages.success(request, 'سفارش با موفقیت لغو شد.')
     else:
         messages.error(request, 'این سفارش قابل لغو نیست.')
@@ -256,46 +276,111 @@ def cancel_order(request, order_number):
 
 @login_required
 def reorder(request, order_number):
-    order = get_object_or_404(Order, order_number=order_number, user=request.user)
+    order = archive.find_order(order_number, request.user)
     cart = get_or_merge_cart(request)
-    for item in order.orderitems.all():
-        if item.product.stock_status:
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=item.product,
-                color=item.color,
-                size=item.size,
-                defaults={'quantity': item.quantity}
-            )
-            if not created:
-                cart_item.quantity += item.quantity
-                cart_item.save()
-            item.product.sales_count += item.quantity
-            item.product.save()
+    lines, unavailable = [], []
+    for item in order.orderitems.select_related('product'):
+        if not item.product.stock_status:
+            continue
+        line = (item.product_id, item.color_id, item.size_id, item.quantity)
+        try:
+            inventory.reserve(cart.reservation_owner, *line)
+        except inventory.OutOfStock:
+            unavailable.append(item.product.name)
+            continue
+        lines.append(line)
+    cart.add_lines(lines)
+    sales.record((product_id, quantity) for product_id, _, _, quantity in lines)
+    if unavailable:
+        messages.warning(request, f'موجودی این محصولات کافی نبود: {"، ".join(unavailable)}')
     messages.success(request, 'محصولات سفارش به سبد خرید اضافه شدند.')
     return redirect('cart:cart_detail')
 
+def _track_order_etag(request, order_number):
+    """ETag صفحه پیگیری از روی نسخه سفارش و شمارنده‌های هدر؛ برای پاسخ 304 یک کوئری سبک کافی است"""
+    if not request.user.is_authenticated:
+        return None
+    row = Order.objects.filter(order_number=order_number, user=request.user).values_list('pk', 'updated_at').first()
+    if row is None:
+        return None
+    counts = badges.counts(request)
+    return f"{row[0]}-{int(row[1].timestamp() * 1_000_000)}-{counts['cart_count']}-{counts['order_count']}-{counts['wishlist_count']}"
+
 @login_required
+@condition(etag_func=_track_order_etag)
 def track_order(request, order_number):
     order = get_object_or_404(Order, order_number=order_number, user=request.user)
+    history = [
+        {
+            'id': event.pk,
+            'status': event.status,
+            'status_display': event.get_status_display(),
+            'date': event.created_at,
+            'description': event.description,
+            'completed': True,
+        }
+        for event in order.status_events.order_by('id')
+    ]
     context = {
         'order': order,
         'tracking_info': {
             'status': order.get_status_display(),
+            'status_code': order.status,
             'tracking_number': order.tracking_number,
             'last_updated': order.updated_at,
-        }
+            'history': history,
+            'last_event_id': history[-1]['id'] if history else 0,
+        },
+        # SSE فقط زیر ASGI باز می‌ماند؛ زیر WSGI صفحه با همین ETag بررسی می‌شود
+        'live_updates': isinstance(request, ASGIRequest),
+        'etag': _track_order_etag(request, order_number),
+        'poll_ms': tracking.PAGE_POLL_INTERVAL * 1000,
     }
     return render(request, 'cart/track_order.html', context)
 
+async def order_events(request, order_number):
+    """جریان SSE تغییرات وضعیت سفارش؛ فقط زیر ASGI (core/asgi.py)
+
+    زیر WSGI هر اتصال یک نخ کارگر را نگه می‌دارد، پس پاسخ 204 داده می‌شود که EventSource
+    را برای همیشه می‌بندد و صفحه پیگیری به بررسی دوره‌ای با ETag برمی‌گردد.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return HttpResponseForbidden()
+    order = await Order.objects.filter(order_number=order_number, user=user).values('pk', 'status').afirst()
+    if order is None:
+        raise Http404
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_id = 0
+    response = StreamingHttpResponse(
+        tracking.stream(order['pk'], last_id, status=order['status']),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def download_invoice(request, order_number):
-    order = get_object_or_404(Order, order_number=order_number, user=request.user)
-    html = render_to_string('cart/invoice.html', {'order': order, 'order_items': order.orderitems.all()})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="invoice_{order.order_number}.pdf"'
-    pdfkit.from_string(html, response)
-    return response
+    order = archive.find_order(order_number, request.user)
+    try:
+        path = invoices.get(order)
+    except invoices.InvoiceNotReady:
+        messages.info(request, 'فاکتور در حال آماده‌سازی است؛ چند لحظه دیگر دوباره تلاش کنید.')
+        return redirect('cart:order_detail', order_number=order.order_number)
+    except Exception as e:
+        messages.error(request, f'خطا در ساخت فاکتور: {str(e)}')
+        return redirect('cart:order_detail', order_number=order.order_number)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f'invoice_{order.order_number}.pdf',
+        content_type='application/pdf',
+    )
 
 @login_required
 @user_passes_test(is_admin)
@@ -306,11 +391,7 @@ def admin_cart_management(request):
     carts = Cart.objects.all().select_related('user')
     orders = Order.objects.filter(order_number__isnull=False, order_number__gt='').select_related('user', 'address')
 
-    cart_totals = {}
-    for cart in carts:
-        total_price = sum(item.get_total_price() for item in cart.cartitem_set.all())
-        total_discount = sum(item.get_discount() for item in cart.cartitem_set.all())
-        cart_totals[cart.id] = total_price - total_discount
+    cart_totals = pricing.totals_by_cart(carts)
 
     if order_status in ['PENDING', 'SHIPPED', 'DELIVERED', 'CANCELED']:
         orders = orders.filter(status=order_status)
@@ -325,18 +406,17 @@ def admin_cart_management(request):
 
         if action == 'delete_cart' and cart_id:
             cart = get_object_or_404(Cart, id=cart_id)
-            for item in cart.cartitem_set.all():
-                item.product.sales_count -= item.quantity
-                item.product.save()
+            items = cart.cartitem_set.values_list('product_id', 'quantity')
+            sales.record((product_id, -quantity) for product_id, quantity in items)
+            inventory.release_owner(cart.reservation_owner)
             cart.delete()
             messages.success(request, 'سبد خرید با موفقیت حذف شد.')
             return redirect('cart:admin_cart_management')
 
         elif action == 'delete_order' and order_id:
             order = get_object_or_404(Order, id=order_id)
-            for item in order.orderitems.all():
-                item.product.sales_count -= item.quantity
-                item.product.save()
+            items = order.orderitems.values_list('product_id', 'quantity')
+            sales.record((product_id, -quantity) for product_id, quantity in items)
             order.delete()
             messages.success(request, 'سفارش با موفقیت حذف شد.')
             return redirect('cart:admin_cart_management')
@@ -345,8 +425,7 @@ def admin_cart_management(request):
             order = get_object_or_404(Order, id=order_id)
             new_status = request.POST.get('status')
             if new_status in ['PENDING', 'SHIPPED', 'DELIVERED', 'CANCELED']:
-                order.status = new_status
-                order.save()
+                order.change_status(new_status, request.POST.get('description', ''))
                 messages.success(request, f'وضعیت سفارش {order.order_number} به {order.get_status_display()} تغییر کرد.')
             else:
                 messages.error(request, 'وضعیت نامعتبر است.')
@@ -356,20 +435,21 @@ def admin_cart_management(request):
             item_id = request.POST.get('item_id')
             cart_item = get_object_or_404(CartItem, id=item_id)
             try:
-                quantity = int(request.POST.get('quantity', 1))
+                quantity = max(int(request.POST.get('quantity', 1)), 0)
+                _adjust_item_reservation(cart_item, quantity)
                 if quantity < 1:
-                    cart_item.product.sales_count -= cart_item.quantity
-                    cart_item.product.save()
+                    sales.record([(cart_item.product_id, -cart_item.quantity)])
                     cart_item.delete()
                     messages.success(request, 'آیتم سبد خرید حذف شد.')
                 else:
-                    cart_item.product.sales_count += (quantity - cart_item.quantity)
-                    cart_item.product.save()
+                    sales.record([(cart_item.product_id, quantity - cart_item.quantity)])
                     cart_item.quantity = quantity
                     cart_item.save()
                     messages.success(request, 'آیتم سبد خرید به‌روزرسانی شد.')
             except ValueError:
                 messages.error(request, 'تعداد نامعتبر است.')
+            except inventory.OutOfStock:
+                messages.error(request, 'موجودی این محصول کافی نیست.')
             return redirect('cart:admin_cart_management')
 
     context = {
@@ -63,6 +63,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "account.context_processors.header_badges",
             ],
         },
     },
@@ -76,6 +77,20 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # دیتابیس تست روی فایل تا تست‌های چندنخی با اتصال‌های جدا منتظر قفل بمانند؛
+        # SQLite درون حافظه مشترک بدون انتظار خطای «table is locked» می‌دهد
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    }
+}
+
+# کش مشترک بین همه پروسه‌های وب برای شمارنده‌های هدر و اعلان پیگیری سفارش که باید در
+# همه پروسه‌ها یکی باشند (LocMemCache فقط درون یک پروسه است). برای اجرا روی چند سرور
+# BACKEND را به Redis یا Memcached تغییر دهید.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("DJANGO_CACHE_DIR", str(BASE_DIR / "cache")),
+        "OPTIONS": {"MAX_ENTRIES": 20000},
     }
 }
 
@@ -118,3 +133,40 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# شمارنده بازدید محصولات (ثانیه بین هر نوشتن و حداکثر محصولات در بافر)
+PRODUCT_VIEWS_FLUSH_INTERVAL = 10
+PRODUCT_VIEWS_MAX_PENDING = 1000
+
+# سبد خرید کاربران مهمان در کوکی امضاشده (نام کوکی، عمر به ثانیه و حداکثر ردیف)
+ANONYMOUS_CART_COOKIE_NAME = 'cart'
+ANONYMOUS_CART_MAX_AGE = 30 * 24 * 3600
+ANONYMOUS_CART_MAX_ITEMS = 50
+
+# مدت نگهداری شمارنده‌های هدر در کش (ثانیه)
+HEADER_BADGES_TIMEOUT = 300
+
+# دفتر فروش: رویدادهای جوان‌تر از این مقدار (ثانیه) در rollup بعدی اعمال می‌شوند
+SALES_LEDGER_SETTLE_SECONDS = 5
+
+# سبدهای مهمان قدیمی‌تر از این تعداد روز با دستور reap_carts حذف می‌شوند
+CART_REAP_AFTER_DAYS = 30
+
+# مدت رزرو موجودی پس از افزودن به سبد خرید (ثانیه)
+STOCK_RESERVATION_TTL = 15 * 60
+
+# تابع تولید شماره سفارش (مسیر کامل)؛ پیش‌فرض ULID مرتب بر اساس زمان است
+ORDER_NUMBER_GENERATOR = 'cart.order_numbers.ulid'
+
+# ساخت فاکتور PDF: تعداد نخ‌های پس‌زمینه و حداکثر انتظار درخواست دانلود (ثانیه)
+INVOICE_WORKERS = 2
+INVOICE_WAIT = 10
+
+# پیگیری زنده سفارش (SSE): فاصله بررسی کش و حداکثر عمر هر اتصال (ثانیه)؛ فقط زیر ASGI.
+# زیر WSGI صفحه پیگیری هر ORDER_TRACKING_POLL_INTERVAL ثانیه با ETag بررسی می‌شود.
+ORDER_EVENTS_POLL_INTERVAL = 2
+ORDER_EVENTS_STREAM_DURATION = 300
+ORDER_TRACKING_POLL_INTERVAL = 30
+
+# سفارش‌های تحویل‌شده یا لغوشده‌ای که این تعداد روز تغییر نکرده‌اند با دستور archive_orders بایگانی می‌شوند
+ORDER_ARCHIVE_AFTER_DAYS = 180
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, ProductImage, Color, Size, ProductSpecification, Review, ShippingPolicy
+from .models import Product, ProductImage, Color, Size, ProductSpecification, Review, ShippingPolicy, Stock
 
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
@@ -13,6 +13,18 @@ class SizeInline(admin.TabularInline):
     model = Size
     extra = 1
 
+class StockInline(admin.TabularInline):
+    model = Stock
+    extra = 1
+    readonly_fields = ['reserved']
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # فقط رنگ و سایزهای همین محصول قابل انتخاب باشند
+        product_id = request.resolver_match.kwargs.get('object_id') if request.resolver_match else None
+        if db_field.name in ('color', 'size'):
+            kwargs['queryset'] = db_field.related_model.objects.filter(product_id=product_id)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 class ProductSpecificationInline(admin.TabularInline):
     model = ProductSpecification
     extra = 1
@@ -27,9 +39,11 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ['category', 'brand', 'stock_status', 'is_new']
     search_fields = ['name', 'product_code', 'tags']
     prepopulated_fields = {'slug': ('name',)}
-    inlines = [ProductImageInline, ColorInline, SizeInline, ProductSpecificationInline, ShippingPolicyInline]
+    inlines = [ProductImageInline, ColorInline, SizeInline, StockInline, ProductSpecificationInline, ShippingPolicyInline]
     list_editable = ['stock_status', 'is_new']
     fields = ['name', 'slug', 'description', 'price', 'discount_price', 'stock_status', 'category', 'brand', 'product_code', 'tags', 'is_new', 'views_count', 'sales_count']
+    # شمارنده‌ها فقط از دفتر فروش و شمارش بازدید به‌روز می‌شوند؛ ذخیره فرم مدیریت نباید آن‌ها را بازنویسی کند
+    readonly_fields = ['views_count', 'sales_count']
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
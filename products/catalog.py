@@ -0,0 +1,285 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BooleanField
+
+from . import facets
+from .models import Product, ProductImage, Color, Size, ProductSpecification, ShippingPolicy
+
+PRODUCT_FIELDS = (
+    'slug', 'name', 'description', 'price', 'discount_price', 'stock_status', 'category',
+    'brand', 'product_code', 'tags', 'is_new', 'is_featured',
+)
+BOOLEAN_FIELDS = ('stock_status', 'is_new', 'is_featured')
+
+# مجموعه‌های وابسته: (مدل، فیلدهای کلید، فیلدهای مقدار)
+CHILDREN = {
+    'colors': (Color, ('hex_code',), ('name',)),
+    'sizes': (Size, ('name',), ('available',)),
+    'specifications': (ProductSpecification, ('title',), ('value',)),
+    'shipping_policies': (ShippingPolicy, ('title',), ('description',)),
+    'images': (ProductImage, ('image',), ('is_main',)),
+}
+
+FORMATS = ('jsonl', 'csv')
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    for name in FORMATS:
+        if str(path).lower().endswith(f'.{name}'):
+            return name
+    raise CatalogError(f"فرمت فایل {path} مشخص نیست؛ از --format استفاده کنید.")
+
+
+def _to_bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _to_price(value, required):
+    if value in (None, ''):
+        if required:
+            raise CatalogError("قیمت الزامی است.")
+        return None
+    try:
+        price = Decimal(str(value))
+    except InvalidOperation:
+        raise CatalogError(f"قیمت نامعتبر: {value}")
+    if not price.is_finite() or price < 0:
+        raise CatalogError(f"قیمت نامعتبر: {value}")
+    return price
+
+
+def _clean(model, values, fields, allow_blank=()):
+    """اجرای اعتبارسنجی فیلدهای مدل (اسلاگ، حداکثر طول، ارقام قیمت، choices) روی یک ردیف
+
+    مقدارهای تبدیل‌شده در values نوشته می‌شوند؛ خطاها همه با هم به صورت CatalogError
+    گزارش می‌شوند تا ردیف نامعتبر درج نشود.
+    """
+    errors = []
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = values.get(name)
+        if isinstance(field, BooleanField):
+            value = _to_bool(value, field.default)
+        if name in allow_blank and value in field.empty_values:
+            continue
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors.append(f"{name}: {' '.join(exc.messages)}")
+    if errors:
+        raise CatalogError('؛ '.join(errors))
+
+
+def read_records(stream, fmt):
+    """خواندن جریانی رکوردها؛ در CSV ستون‌های مجموعه‌ای به صورت JSON نوشته می‌شوند"""
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, CatalogError(f"JSON نامعتبر: {exc}")
+    else:
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            record = {key: value for key, value in row.items() if key}
+            try:
+                for name in CHILDREN:
+                    if record.get(name):
+                        record[name] = json.loads(record[name])
+                    else:
+                        record.pop(name, None)
+            except json.JSONDecodeError as exc:
+                yield line_number, CatalogError(f"JSON نامعتبر در ستون {name}: {exc}")
+                continue
+            yield line_number, record
+
+
+def build_product(record):
+    for field in ('slug', 'name'):
+        if not record.get(field):
+            raise CatalogError(f"فیلد {field} الزامی است.")
+    values = {
+        'slug': record['slug'],
+        'name': record['name'],
+        'description': record.get('description') or '',
+        'price': _to_price(record.get('price'), required=True),
+        'discount_price': _to_price(record.get('discount_price'), required=False),
+        'category': record.get('category') or '',
+        'brand': record.get('brand') or '',
+        'product_code': record.get('product_code') or '',
+        'tags': record.get('tags') or '',
+    }
+    for field in BOOLEAN_FIELDS:
+        values[field] = _to_bool(record.get(field), Product._meta.get_field(field).default)
+    # فیلدهای متنی خالی مثل قبل پذیرفته می‌شوند؛ بقیه قیدهای مدل باید برقرار باشند
+    _clean(Product, values, PRODUCT_FIELDS, allow_blank=('description', 'category', 'brand', 'product_code'))
+    for name, (model, key_fields, value_fields) in CHILDREN.items():
+        rows = record.get(name)
+        if not isinstance(rows, list):
+            continue
+        for row in rows:
+            if not isinstance(row, dict):
+                raise CatalogError(f"ردیف نامعتبر در {name}: {row}")
+            try:
+                _clean(model, row, [field for field in key_fields + value_fields if field in row or field in key_fields])
+            except CatalogError as exc:
+                raise CatalogError(f"{name}: {exc}")
+    return Product(**values)
+
+
+def _sync_children(model, key_fields, value_fields, rows_by_product):
+    """هم‌گام‌سازی ردیف‌های وابسته بدون حذف ردیف‌هایی که تغییری نکرده‌اند
+
+    حذف نکردن رنگ و سایزهای موجود باعث می‌شود ارجاع آیتم‌های سبد و سفارش از بین نرود.
+    """
+    if not rows_by_product:
+        return
+    current = list(model.objects.filter(product_id__in=rows_by_product))
+    existing = {(obj.product_id, *[getattr(obj, field) for field in key_fields]): obj for obj in current}
+    to_create, to_update, keep = [], [], set()
+    for product_id, rows in rows_by_product.items():
+        for row in rows:
+            key = (product_id, *[row.get(field) for field in key_fields])
+            values = {field: row[field] for field in value_fields if field in row}
+            obj = existing.get(key)
+            if obj is None:
+                data = dict(zip(key_fields, key[1:]), **values)
+                to_create.append(model(product_id=product_id, **data))
+            elif obj.pk not in keep:
+                keep.add(obj.pk)
+                changed = {field: value for field, value in values.items() if getattr(obj, field) != value}
+                for field, value in changed.items():
+                    setattr(obj, field, value)
+                if changed:
+                    to_update.append(obj)
+    stale = [obj.pk for obj in current if obj.pk not in keep]
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    if to_update:
+        model.objects.bulk_update(to_update, list(value_fields))
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+
+def import_chunk(records):
+    """درج یا به‌روزرسانی یک دسته محصول (بر اساس slug) همراه با مجموعه‌های وابسته"""
+    products = {}
+    for record, product in records:
+        products[product.slug] = (record, product)
+    slugs = list(products)
+    with transaction.atomic():
+        existing = set(Product.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        update_fields = [field for field in PRODUCT_FIELDS if field != 'slug'] + ['effective_price']
+        Product.objects.bulk_create(
+            [product for _, product in products.values()],
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=update_fields,
+        )
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+        for name, (model, key_fields, value_fields) in CHILDREN.items():
+            rows_by_product = {
+                ids[slug]: record[name]
+                for slug, (record, _) in products.items()
+                if isinstance(record.get(name), list)
+            }
+            _sync_children(model, key_fields, value_fields, rows_by_product)
+        Product.objects.filter(id__in=ids.values()).refresh_main_images()
+    created = len(slugs) - len(existing)
+    return created, len(existing)
+
+
+def import_catalog(stream, fmt, chunk_size=500, on_error=None):
+    """وارد کردن جریانی فایل؛ حافظه مصرفی فقط به اندازه یک دسته است"""
+    stats = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+    chunk = []
+
+    def flush():
+        created, updated = import_chunk(chunk)
+        stats['created'] += created
+        stats['updated'] += updated
+        chunk.clear()
+
+    for line_number, record in read_records(stream, fmt):
+        stats['rows'] += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            chunk.append((record, build_product(record)))
+        except CatalogError as exc:
+            stats['skipped'] += 1
+            if on_error:
+                on_error(line_number, exc)
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    facets.invalidate()
+    return stats
+
+
+def export_records(chunk_size=500):
+    """خروجی جریانی محصولات به ترتیب id؛ برای هر دسته یک کوئری محصول و یک کوئری برای هر مجموعه وابسته
+
+    به جای ساختن نمونه مدل‌ها از values() استفاده می‌شود تا خروجی سریع و حافظه ثابت بماند.
+    """
+    last_id = 0
+    while True:
+        chunk = list(
+            Product.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values('id', *PRODUCT_FIELDS)[:chunk_size]
+        )
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        children = {}
+        for name, (model, key_fields, value_fields) in CHILDREN.items():
+            grouped = children[name] = {}
+            rows = model.objects.filter(product_id__in=ids).order_by('id').values_list('product_id', *key_fields, *value_fields)
+            fields = key_fields + value_fields
+            for product_id, *values in rows:
+                grouped.setdefault(product_id, []).append(dict(zip(fields, values)))
+        for row in chunk:
+            record = {field: row[field] for field in PRODUCT_FIELDS}
+            for field in ('price', 'discount_price'):
+                if record[field] is not None:
+                    record[field] = str(record[field])
+            for name, grouped in children.items():
+                record[name] = grouped.get(row['id'], [])
+            yield record
+        last_id = ids[-1]
+
+
+def write_records(stream, fmt, records):
+    count = 0
+    if fmt == 'jsonl':
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+        return count
+    writer = csv.DictWriter(stream, fieldnames=list(PRODUCT_FIELDS) + list(CHILDREN))
+    writer.writeheader()
+    for record in records:
+        for name in CHILDREN:
+            record[name] = json.dumps(record[name], ensure_ascii=False)
+        writer.writerow(record)
+        count += 1
+    return count
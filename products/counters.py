@@ -0,0 +1,126 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def apply_deltas(model, field, items, batch_size=500):
+    """افزودن (pk, مقدار) ها به یک فیلد عددی با UPDATE های دسته‌ای مبتنی بر F()"""
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        delta = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in batch],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        model.objects.filter(pk__in=[pk for pk, _ in batch]).update(**{field: F(field) + delta})
+
+
+class BufferedCounter:
+    """شمارنده با نوشتن تأخیری
+
+    افزایش‌ها در حافظه همین پروسه جمع می‌شوند و به صورت دوره‌ای با یک UPDATE
+    مبتنی بر F() روی جدول نوشته می‌شوند؛ save() صدا زده نمی‌شود و updated_at دست نمی‌خورد.
+    """
+
+    def __init__(self, model, field, interval=10, max_pending=1000, batch_size=500):
+        self.model = model
+        self.field = field
+        self.interval = interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flusher = None
+        self.last_flush = None
+        self.flushed_total = 0
+
+    def incr(self, pk, delta=1):
+        with self._lock:
+            self._pending[pk] = self._pending.get(pk, 0) + delta
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= self.max_pending
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def pending(self, pk):
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def lag(self):
+        """ثانیه‌های گذشته از قدیمی‌ترین افزایشی که هنوز نوشته نشده"""
+        oldest = self._oldest
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def stats(self):
+        with self._lock:
+            pending_keys = len(self._pending)
+            pending_total = sum(self._pending.values())
+        return {
+            'field': f'{self.model._meta.label}.{self.field}',
+            'pending_keys': pending_keys,
+            'pending_total': pending_total,
+            'flush_lag_seconds': round(self.lag(), 3),
+            'flushed_total': self.flushed_total,
+            'last_flush': self.last_flush,
+        }
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            oldest, self._oldest = self._oldest, None
+        if not pending:
+            return 0
+        items = list(pending.items())
+        try:
+            with transaction.atomic():
+                apply_deltas(self.model, self.field, items, self.batch_size)
+        except Exception:
+            # برگرداندن افزایش‌ها به بافر تا در نوبت بعدی نوشته شوند
+            with self._lock:
+                for pk, value in items:
+                    self._pending[pk] = self._pending.get(pk, 0) + value
+                if oldest is not None and (self._oldest is None or oldest < self._oldest):
+                    self._oldest = oldest
+            logger.exception('flushing %s.%s failed', self.model._meta.label, self.field)
+            return 0
+        self.flushed_total += sum(pending.values())
+        self.last_flush = time.time()
+        return len(items)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name=f'{self.field}-flusher', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+
+view_counter = BufferedCounter(
+    Product,
+    'views_count',
+    interval=getattr(settings, 'PRODUCT_VIEWS_FLUSH_INTERVAL', 10),
+    max_pending=getattr(settings, 'PRODUCT_VIEWS_MAX_PENDING', 1000),
+)
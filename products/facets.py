@@ -0,0 +1,214 @@
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from . import versions
+from .models import Product, Color, Size
+
+VERSION_KEY = 'products:facets:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'index': None}
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+def _to_decimal(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+class FacetIndex:
+    """ایندکس بیتی فیلترهای کاتالوگ؛ هر مقدار فیلتر یک ماسک از محصولات دارد"""
+
+    RATING_FILTERS = ('1', '2', '3', '4', '5')
+    PRICE_BUCKETS = 8
+
+    def __init__(self, products, colors, sizes):
+        # جایگاه هر محصول بر اساس قیمت مرتب می‌شود تا بازه قیمت یک بازه پیوسته از بیت‌ها باشد
+        products = sorted(products, key=lambda row: (row[1], row[0]))
+        # ratings[k] ماسک محصولات با میانگین امتیاز حداقل k است
+        self.ratings = {star: 0 for star in range(1, 6)}
+        self.ids = [row[0] for row in products]
+        self.prices = [row[1] for row in products]
+        self.positions = {product_id: pos for pos, product_id in enumerate(self.ids)}
+        self.all_mask = (1 << len(self.ids)) - 1
+        self.price_buckets = self._make_price_buckets()
+
+        self.categories = {}
+        self.brands = {}
+        for pos, (_, _, category, brand, rating_avg) in enumerate(products):
+            self.categories[category] = self.categories.get(category, 0) | (1 << pos)
+            self.brands[brand] = self.brands.get(brand, 0) | (1 << pos)
+            for star in range(1, 6):
+                if rating_avg >= star:
+                    self.ratings[star] |= 1 << pos
+
+        self.colors = {}
+        self.color_names = {}
+        for product_id, hex_code, name in colors:
+            pos = self.positions.get(product_id)
+            if pos is None:
+                continue
+            self.colors[hex_code] = self.colors.get(hex_code, 0) | (1 << pos)
+            self.color_names.setdefault(hex_code, name)
+
+        self.sizes = {}
+        for product_id, name in sizes:
+            pos = self.positions.get(product_id)
+            if pos is None:
+                continue
+            self.sizes[name] = self.sizes.get(name, 0) | (1 << pos)
+
+    def _make_price_buckets(self):
+        """بازه‌های هم‌عرض قیمت برای هیستوگرام؛ هر بازه یک محدوده پیوسته از بیت‌هاست"""
+        if not self.prices:
+            return []
+        low, high = self.prices[0], self.prices[-1]
+        width = max((high - low) // self.PRICE_BUCKETS, 1)
+        buckets = []
+        start = low
+        while start <= high:
+            end = start + width if start + width <= high - width // 2 else high + 1
+            first = bisect_left(self.prices, start)
+            last = bisect_left(self.prices, end)
+            mask = ((1 << last) - 1) ^ ((1 << first) - 1)
+            buckets.append((start, end - 1, mask))
+            start = end
+        return buckets
+
+    @classmethod
+    def build(cls):
+        products = Product.objects.values_list('id', 'effective_price', 'category', 'brand', 'rating_avg')
+        colors = Color.objects.values_list('product_id', 'hex_code', 'name').order_by('id')
+        sizes = Size.objects.filter(available=True).values_list('product_id', 'name')
+        return cls(list(products), list(colors), list(sizes))
+
+    def price_mask(self, min_price=None, max_price=None):
+        min_price = _to_decimal(min_price)
+        max_price = _to_decimal(max_price)
+        low = bisect_left(self.prices, min_price) if min_price is not None else 0
+        high = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        if high <= low:
+            return 0
+        return ((1 << high) - 1) ^ ((1 << low) - 1)
+
+    def _filter_masks(self, filters):
+        """ماسک هر فیلتر فعال به تفکیک نام فیلتر"""
+        masks = {}
+        category = filters.get('category')
+        if category and category != 'all':
+            masks['category'] = self.categories.get(category, 0)
+        brand = filters.get('brand')
+        if brand and brand != 'all':
+            masks['brand'] = self.brands.get(brand, 0)
+        if filters.get('color'):
+            masks['color'] = self.colors.get(filters['color'], 0)
+        if filters.get('size'):
+            masks['size'] = self.sizes.get(filters['size'], 0)
+        if filters.get('min_rating') in self.RATING_FILTERS:
+            masks['rating'] = self.ratings[int(filters['min_rating'])]
+        if filters.get('min_price') or filters.get('max_price'):
+            masks['price'] = self.price_mask(filters.get('min_price'), filters.get('max_price'))
+        return masks
+
+    def ids_mask(self, ids):
+        result = 0
+        for product_id in ids:
+            pos = self.positions.get(product_id)
+            if pos is not None:
+                result |= 1 << pos
+        return result
+
+    def mask(self, filters, exclude=None):
+        result = self.all_mask
+        for name, value in self._filter_masks(filters).items():
+            if name != exclude:
+                result &= value
+        return result
+
+    def count(self, filters, ids=None):
+        mask = self.mask(filters)
+        if ids is not None:
+            mask &= self.ids_mask(ids)
+        return _popcount(mask)
+
+    def facets(self, filters, ids=None):
+        """شمارش هر مقدار فیلتر با در نظر گرفتن سایر فیلترهای فعال
+
+        ids در صورت وجود (مثلاً نتایج جستجو) شمارش‌ها را به همان محصولات محدود می‌کند.
+        """
+        masks = self._filter_masks(filters)
+        within = self.all_mask if ids is None else self.ids_mask(ids)
+
+        def others(exclude):
+            result = within
+            for name, value in masks.items():
+                if name != exclude:
+                    result &= value
+            return result
+
+        base = others('category')
+        categories = [
+            {'category': value, 'count': _popcount(mask & base)}
+            for value, mask in sorted(self.categories.items())
+        ]
+        base = others('brand')
+        brands = [
+            {'brand': value, 'count': _popcount(mask & base)}
+            for value, mask in sorted(self.brands.items())
+        ]
+        base = others('color')
+        colors = [
+            {'hex_code': value, 'name': self.color_names[value], 'count': _popcount(mask & base)}
+            for value, mask in sorted(self.colors.items())
+        ]
+        base = others('size')
+        sizes = [
+            {'name': value, 'count': _popcount(mask & base)}
+            for value, mask in sorted(self.sizes.items())
+        ]
+        base = others('rating')
+        ratings = [
+            {'stars': star, 'count': _popcount(self.ratings[star] & base)}
+            for star in range(5, 0, -1)
+        ]
+        base = others('price')
+        prices = [
+            {'min': low, 'max': high, 'count': _popcount(mask & base)}
+            for low, high, mask in self.price_buckets
+        ]
+        widest = max([bucket['count'] for bucket in prices] or [0])
+        for bucket in prices:
+            bucket['percent'] = bucket['count'] * 100 // widest if widest else 0
+        return {
+            'categories': categories,
+            'brands': brands,
+            'colors': colors,
+            'sizes': sizes,
+            'ratings': ratings,
+            'prices': prices,
+        }
+
+
+def get_index():
+    """ایندکس معتبر فعلی؛ در صورت تغییر نسخه دوباره ساخته می‌شود"""
+    version = versions.current(VERSION_KEY)
+    if _state['version'] == version and _state['index'] is not None:
+        return _state['index']
+    with _lock:
+        if _state['version'] != version or _state['index'] is None:
+            _state['index'] = FacetIndex.build()
+            _state['version'] = version
+        return _state['index']
+
+
+def invalidate():
+    """بی‌اعتبار کردن ایندکس در همه پروسه‌ها همراه با تراکنش جاری"""
+    versions.bump(VERSION_KEY)
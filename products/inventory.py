@@ -0,0 +1,175 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import Stock, StockReservation
+
+RESERVATION_TTL = getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+
+
+class OutOfStock(Exception):
+    """موجودی یک تنوع برای تعداد درخواستی کافی نیست"""
+
+    def __init__(self, product_id, color_id=None, size_id=None):
+        self.product_id = product_id
+        self.color_id = color_id
+        self.size_id = size_id
+        super().__init__(f"موجودی محصول {product_id} کافی نیست.")
+
+
+def stock_ids(lines):
+    """نگاشت (product_id, color_id, size_id) به شناسه موجودی با یک کوئری
+
+    تنوع‌هایی که ردیف موجودی ندارند در خروجی نیستند و موجودی آن‌ها کنترل نمی‌شود.
+    """
+    keys = {tuple(line[:3]) for line in lines}
+    if not keys:
+        return {}
+    rows = Stock.objects.filter(product_id__in={key[0] for key in keys}).values_list('id', 'product_id', 'color_id', 'size_id')
+    return {tuple(row[1:]): row[0] for row in rows if tuple(row[1:]) in keys}
+
+
+def reserve(owner, product_id, color_id, size_id, quantity):
+    """رزرو موقت موجودی برای سبد؛ اگر موجودی آزاد کافی نباشد OutOfStock
+
+    رزرو با یک UPDATE شرطی (quantity - reserved >= n) انجام می‌شود تا دو درخواست
+    همزمان نتوانند بیش از موجودی رزرو کنند.
+    """
+    stock_id = stock_ids([(product_id, color_id, size_id)]).get((product_id, color_id, size_id))
+    if stock_id is None or quantity <= 0:
+        return
+    expires_at = timezone.now() + timedelta(seconds=RESERVATION_TTL)
+    with transaction.atomic():
+        updated = Stock.objects.filter(pk=stock_id, quantity__gte=F('reserved') + quantity).update(
+            reserved=F('reserved') + quantity
+        )
+        if not updated:
+            raise OutOfStock(product_id, color_id, size_id)
+        extended = StockReservation.objects.filter(owner=owner, stock_id=stock_id).update(
+            quantity=F('quantity') + quantity, expires_at=expires_at
+        )
+        if not extended:
+            StockReservation.objects.create(owner=owner, stock_id=stock_id, quantity=quantity, expires_at=expires_at)
+
+
+def _held(owner, **filters):
+    """رزرو یک صاحب روی هر ردیف موجودی، برای استفاده داخل UPDATE"""
+    return Subquery(
+        StockReservation.objects.filter(owner=owner, stock=OuterRef('pk'), **filters)
+        .values('stock')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+
+
+def release(owner, product_id, color_id, size_id, quantity):
+    """آزاد کردن بخشی از رزرو (مثلاً با کم کردن تعداد یا حذف آیتم از سبد)"""
+    stock_id = stock_ids([(product_id, color_id, size_id)]).get((product_id, color_id, size_id))
+    if stock_id is None or quantity <= 0:
+        return
+    with transaction.atomic():
+        Stock.objects.filter(pk=stock_id, reservations__owner=owner).update(
+            reserved=F('reserved') - Least(Value(quantity), _held(owner))
+        )
+        reservations = StockReservation.objects.filter(owner=owner, stock_id=stock_id)
+        reservations.update(quantity=F('quantity') - Least(F('quantity'), Value(quantity)))
+        reservations.filter(quantity=0).delete()
+
+
+def release_owner(owner):
+    """آزاد کردن همه رزروهای یک سبد (مثلاً هنگام حذف سبد یا پیش از پرداخت)"""
+    with transaction.atomic():
+        Stock.objects.filter(reservations__owner=owner).update(reserved=F('reserved') - _held(owner))
+        StockReservation.objects.filter(owner=owner).delete()
+
+
+def adjust(owner, product_id, color_id, size_id, delta):
+    """رزرو یا آزاد کردن موجودی به اندازه تغییر تعداد یک آیتم سبد"""
+    if delta > 0:
+        reserve(owner, product_id, color_id, size_id, delta)
+    elif delta < 0:
+        release(owner, product_id, color_id, size_id, -delta)
+
+
+def transfer(old_owner, new_owner):
+    """انتقال رزروها به صاحب دیگر (ورود کاربر مهمان یا ادغام سبدها)"""
+    if old_owner == new_owner:
+        return
+    table = connection.ops.quote_name(StockReservation._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (owner, stock_id, quantity, expires_at) "
+                f"SELECT %s, stock_id, quantity, expires_at FROM {table} WHERE owner = %s "
+                f"ON CONFLICT (owner, stock_id) DO UPDATE SET quantity = {table}.quantity + excluded.quantity, "
+                f"expires_at = CASE WHEN excluded.expires_at > {table}.expires_at "
+                f"THEN excluded.expires_at ELSE {table}.expires_at END",
+                [new_owner, old_owner],
+            )
+        StockReservation.objects.filter(owner=old_owner).delete()
+
+
+def commit(owner, lines):
+    """کسر قطعی موجودی هنگام پرداخت؛ باید داخل تراکنش ثبت سفارش صدا زده شود
+
+    اول رزروهای همین سبد آزاد می‌شوند تا اولین دستور تراکنش UPDATE باشد و SQLite قفل
+    نوشتن را از ابتدا بگیرد. سپس ردیف‌های موجودی به ترتیب شناسه قفل و بررسی می‌شوند و
+    همه با یک UPDATE کم می‌شوند؛ تعداد کوئری‌ها به تعداد ردیف‌های سبد بستگی ندارد.
+    اگر موجودی یکی کافی نباشد OutOfStock بالا می‌رود و کل تراکنش برگشت می‌خورد.
+    """
+    totals = Counter()
+    for product_id, color_id, size_id, quantity in lines:
+        totals[(product_id, color_id, size_id)] += quantity
+    with transaction.atomic():
+        release_owner(owner)
+        rows = (
+            Stock.objects.select_for_update()
+            .filter(product_id__in={key[0] for key in totals})
+            .order_by('pk')
+            .values_list('id', 'product_id', 'color_id', 'size_id', 'quantity', 'reserved')
+        )
+        wanted = {}
+        for stock_id, product_id, color_id, size_id, quantity, reserved in rows:
+            key = (product_id, color_id, size_id)
+            if key not in totals:
+                continue
+            if quantity - reserved < totals[key]:
+                raise OutOfStock(*key)
+            wanted[stock_id] = totals[key]
+        if wanted:
+            amount = Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in wanted.items()])
+            Stock.objects.filter(pk__in=wanted).update(quantity=F('quantity') - amount)
+
+
+def release_expired(batch_size=1000, sleep=0.0):
+    """آزاد کردن دسته‌ای رزروهای منقضی؛ خروجی (تعداد رزرو، تعداد واحد آزادشده)"""
+    released = units = 0
+    while True:
+        now = timezone.now()
+        ids = list(
+            StockReservation.objects.filter(expires_at__lt=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return released, units
+        expired = StockReservation.objects.filter(id__in=ids, expires_at__lt=now)
+        with transaction.atomic():
+            # شرط انقضا دوباره بررسی می‌شود چون ممکن است رزرو در این فاصله تمدید شده باشد
+            Stock.objects.filter(reservations__in=expired).update(
+                reserved=F('reserved') - Subquery(
+                    expired.filter(stock=OuterRef('pk')).values('stock').annotate(total=Sum('quantity')).values('total')
+                )
+            )
+            units += expired.aggregate(total=Sum('quantity'))['total'] or 0
+            released += expired.delete()[0]
+        if len(ids) < batch_size:
+            return released, units
+        if sleep:
+            time.sleep(sleep)
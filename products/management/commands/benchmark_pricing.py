@@ -0,0 +1,62 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.checkout import price_items
+from cart.models import CartItem
+from products.models import Product
+
+
+def _items(count, rng):
+    """آیتم‌های سبد ذخیره‌نشده با قیمت‌های تصادفی، شامل تخفیف، بدون تخفیف و قیمت خالی"""
+    items = []
+    for index in range(1, count + 1):
+        price = Decimal(rng.randint(1, 5000) * 1000)
+        discount_price = rng.choice([None, price - 1000 * rng.randint(0, 3), price + 1000])
+        if index % 50 == 0:
+            price = None
+        product = Product(id=index, name=f'p{index}', price=price, discount_price=discount_price)
+        items.append(CartItem(id=index, product=product, quantity=rng.randint(1, 5)))
+    return items
+
+
+def _per_object(items):
+    lines = [(item.get_total_price(), item.get_discount()) for item in items]
+    total_price = sum((line[0] for line in lines), Decimal('0'))
+    total_discount = sum((line[1] for line in lines), Decimal('0'))
+    return lines, total_price, total_discount
+
+
+def _batch(items):
+    priced, totals = price_items(items)
+    return [(line.total_price, line.discount) for line in priced], totals['total_price'], totals['total_discount']
+
+
+class Command(BaseCommand):
+    help = "مقایسه قیمت‌گذاری دسته‌ای products.prices با متدهای تک‌تک CartItem (بدون دیتابیس)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        for count in options['lines']:
+            items = _items(count, rng)
+            if _per_object(items) != _batch(items):
+                raise CommandError(f"batch pricing differs from CartItem methods for {count} lines")
+            timings = {}
+            for label, price in (('per-object', _per_object), ('batch', _batch)):
+                best = None
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    price(items)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[label] = best * 1000
+            self.stdout.write(
+                f"{count} lines: per-object {timings['per-object']:.3f}ms, batch {timings['batch']:.3f}ms "
+                f"({timings['per-object'] / timings['batch']:.1f}x), results identical"
+            )
@@ -0,0 +1,98 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products import inventory
+from products.models import Product, Stock
+
+
+def _read_check_save(stock, owner, quantity, work):
+    """روش قدیمی: خواندن موجودی، بررسی و ذخیره مقدار جدید بدون قفل"""
+    current = Stock.objects.get(pk=stock.pk)
+    if current.quantity < quantity:
+        return False
+    time.sleep(work)
+    current.quantity -= quantity
+    current.save(update_fields=['quantity'])
+    return True
+
+
+def _reserve_commit(stock, owner, quantity, work):
+    """مسیر فعلی: رزرو هنگام افزودن به سبد و کسر اتمی در تراکنش پرداخت"""
+    line = (stock.product_id, stock.color_id, stock.size_id)
+    try:
+        inventory.reserve(owner, *line, quantity)
+    except inventory.OutOfStock:
+        return False
+    time.sleep(work)
+    with transaction.atomic():
+        inventory.commit(owner, [(*line, quantity)])
+    return True
+
+
+class Command(BaseCommand):
+    help = "سنجش خرید همزمان یک تنوع محصول: خواندن-بررسی-ذخیره در برابر رزرو و کسر اتمی"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=50, help="تعداد تلاش خرید هر نخ")
+        parser.add_argument('--stock', type=int, default=200, help="موجودی اولیه تنوع")
+        parser.add_argument('--quantity', type=int, default=1, help="تعداد هر خرید")
+        parser.add_argument('--work-ms', type=float, default=1.0,
+                            help="کار شبیه‌سازی‌شده بین بررسی موجودی و ثبت (ساخت سفارش)")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f'benchmark {tag}', slug=f'benchmark-stock-{tag}', price=1000)
+        stock = Stock.objects.create(product=product, quantity=options['stock'])
+        try:
+            for label, buy in (('read-check-save', _read_check_save), ('reserve + commit', _reserve_commit)):
+                Stock.objects.filter(pk=stock.pk).update(quantity=options['stock'], reserved=0)
+                sold, failed, errors, elapsed = self._run(buy, stock, tag, options)
+                if errors:
+                    self.stderr.write(f"{label}: {len(errors)} errors, first: {errors[0]}")
+                stock.refresh_from_db()
+                attempts = options['threads'] * options['attempts']
+                self.stdout.write(
+                    f"{label}: {attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:,.0f}/s), "
+                    f"sold {sold} of {options['stock']} (oversold {max(sold - options['stock'], 0)}), "
+                    f"rejected {failed}, errors {len(errors)}, stock left {stock.quantity}"
+                )
+        finally:
+            product.delete()
+
+    def _run(self, buy, stock, tag, options):
+        """اجرای همزمان خریدها از چند نخ با اتصال جدا؛ خروجی (واحد فروخته‌شده، ردشده، خطاها، زمان)"""
+        quantity, work = options['quantity'], options['work_ms'] / 1000
+        results = [[0, 0] for _ in range(options['threads'])]
+        errors = []
+        barrier = threading.Barrier(options['threads'])
+
+        def worker(index):
+            counts = results[index]
+            barrier.wait()
+            try:
+                for attempt in range(options['attempts']):
+                    try:
+                        if buy(stock, f'benchmark:{tag}:{index}:{attempt}', quantity, work):
+                            counts[0] += quantity
+                        else:
+                            counts[1] += 1
+                    except inventory.OutOfStock:
+                        counts[1] += 1
+                    except Exception as exc:
+                        errors.append(f'{type(exc).__name__}: {exc}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return sum(counts[0] for counts in results), sum(counts[1] for counts in results), errors, elapsed
@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cart.models import Order, OrderItem
+from cart.order_numbers import ulid
+from products import recommendations
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "ساخت دوباره جدول خرید همزمان محصولات از روی آیتم‌های سفارش"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=recommendations.TOP,
+                            help="حداکثر محصول مرتبط برای هر محصول (0 = همه)")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--benchmark', type=int, default=None, metavar='LINES',
+                            help="اندازه‌گیری روی LINES ردیف سفارش مصنوعی درون تراکنشی که در پایان برگردانده می‌شود")
+        parser.add_argument('--products', type=int, default=2000, help="تعداد محصولات مصنوعی در حالت benchmark")
+        parser.add_argument('--basket', type=int, default=4, help="میانگین ردیف هر سفارش در حالت benchmark")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self._benchmark(options)
+        self._rebuild(options)
+
+    def _rebuild(self, options):
+        started = time.perf_counter()
+        lines, pairs = recommendations.rebuild(top=options['top'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        rate = lines / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{lines} order lines -> {pairs} pairs in {elapsed:.2f}s ({rate:,.0f} lines/s)"
+        ))
+
+    def _benchmark(self, options):
+        """سفارش‌های مصنوعی با محبوبیت نامتوازن محصولات؛ rebuild و record_order اندازه‌گیری و همه چیز برگردانده می‌شود"""
+        rng = random.Random(0)
+        tag = uuid.uuid4().hex[:8]
+        target, basket = options['benchmark'], options['basket']
+        with transaction.atomic():
+            user = User.objects.create(username=f'benchmark-{tag}')
+            products = Product.objects.bulk_create([
+                Product(name=f'benchmark {index}', slug=f'benchmark-{tag}-{index}', price=1000)
+                for index in range(options['products'])
+            ])
+            ids = [product.pk for product in products]
+            weights = [1 / rank for rank in range(1, len(ids) + 1)]
+
+            started = time.perf_counter()
+            written, baskets = 0, []
+            while written < target:
+                orders = Order.objects.bulk_create([
+                    Order(user=user, order_number=ulid(), total_price=0, final_price=0) for _ in range(1000)
+                ])
+                items = []
+                for order in orders:
+                    if written >= target:
+                        break
+                    chosen = set(rng.choices(ids, weights, k=rng.randint(1, 2 * basket - 1)))
+                    chosen = list(chosen)[:target - written]
+                    items += [OrderItem(order=order, product_id=product_id, unit_price=1000) for product_id in chosen]
+                    written += len(chosen)
+                    baskets.append(chosen)
+                OrderItem.objects.bulk_create(items, batch_size=options['chunk_size'])
+            self.stdout.write(f"generated {written} lines in {len(baskets)} orders in {time.perf_counter() - started:.2f}s")
+
+            self._rebuild(options)
+
+            timings = []
+            sample = Order(user=user)
+            for chosen in baskets[:1000]:
+                started = time.perf_counter()
+                recommendations.record_order(sample, chosen, top=options['top'])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"record_order x{len(timings)}: median {statistics.median(timings):.2f}ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms"
+            )
+            transaction.set_rollback(True)
+        self.stdout.write("benchmark data rolled back")
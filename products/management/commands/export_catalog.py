@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import catalog
+
+
+class Command(BaseCommand):
+    help = "خروجی جریانی کاتالوگ محصولات به فایل JSONL یا CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="مسیر فایل خروجی؛ - برای خروجی استاندارد")
+        parser.add_argument('--format', choices=catalog.FORMATS, help="فرمت فایل؛ پیش‌فرض از پسوند فایل")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = catalog.detect_format(path, options['format'] or ('jsonl' if path == '-' else None))
+        except catalog.CatalogError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        records = catalog.export_records(chunk_size=options['chunk_size'])
+        if path == '-':
+            count = catalog.write_records(self.stdout, fmt, records)
+        else:
+            try:
+                with open(path, 'w', encoding='utf-8', newline='') as stream:
+                    count = catalog.write_records(stream, fmt, records)
+            except OSError as exc:
+                raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else 0
+        # گزارش در stderr تا خروجی استاندارد فقط شامل داده باشد
+        self.stderr.write(self.style.SUCCESS(f"{count} products in {elapsed:.2f}s ({rate:,.0f} rows/s)"))
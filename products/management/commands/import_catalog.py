@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import catalog
+
+
+class Command(BaseCommand):
+    help = "وارد کردن جریانی کاتالوگ محصولات از فایل JSONL یا CSV (درج یا به‌روزرسانی بر اساس slug)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="مسیر فایل ورودی")
+        parser.add_argument('--format', choices=catalog.FORMATS, help="فرمت فایل؛ پیش‌فرض از پسوند فایل")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            fmt = catalog.detect_format(options['path'], options['format'])
+        except catalog.CatalogError as exc:
+            raise CommandError(str(exc))
+
+        def on_error(line_number, exc):
+            self.stderr.write(f"line {line_number}: {exc}")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as stream:
+                stats = catalog.import_catalog(stream, fmt, chunk_size=options['chunk_size'], on_error=on_error)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        rate = stats['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rows']} rows ({stats['created']} created, {stats['updated']} updated, "
+            f"{stats['skipped']} skipped) in {elapsed:.2f}s ({rate:,.0f} rows/s)"
+        ))
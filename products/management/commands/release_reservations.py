@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import inventory
+
+
+class Command(BaseCommand):
+    help = "آزاد کردن دسته‌ای رزروهای منقضی موجودی (برای اجرای دوره‌ای)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help="مکث بین دسته‌ها (ثانیه)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        released, units = inventory.release_expired(batch_size=options['batch_size'], sleep=options['sleep'])
+        elapsed = time.perf_counter() - started
+        rate = released / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{released} reservations ({units} units) released in {elapsed:.2f}s ({rate:,.0f} rows/s)"
+        ))
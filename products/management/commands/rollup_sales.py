@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import sales
+
+
+class Command(BaseCommand):
+    help = "اعمال رویدادهای دفتر فروش روی تعداد فروش محصولات (برای اجرای دوره‌ای)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--settle-seconds', type=int, default=sales.SETTLE_SECONDS,
+                            help="رویدادهای جوان‌تر از این مقدار در اجرای بعدی اعمال می‌شوند")
+        parser.add_argument('--prune-days', type=int, default=None,
+                            help="حذف رویدادهای اعمال‌شده قدیمی‌تر از این تعداد روز")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        applied = sales.rollup(batch_size=options['batch_size'], settle_seconds=options['settle_seconds'])
+        elapsed = time.perf_counter() - started
+        rate = applied / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"{applied} events applied in {elapsed:.2f}s ({rate:,.0f} events/s)"))
+        if options['prune_days'] is not None:
+            deleted = sales.prune(options['prune_days'])
+            self.stdout.write(f"{deleted} old events pruned")
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 15:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_main_images(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductImage = apps.get_model("products", "ProductImage")
+    main_image = (
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("-is_main", "id")
+        .values("image")[:1]
+    )
+    Product.objects.update(main_image=Coalesce(Subquery(main_image), Value("")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_is_featured"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="main_image",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                upload_to="products/",
+                verbose_name="تصویر اصلی",
+            ),
+        ),
+        migrations.RunPython(fill_main_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2 on 2026-10-18 15:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_rating_stats(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    histogram = {}
+    rows = Review.objects.values("product_id", "rating").annotate(total=Count("id"))
+    for row in rows.order_by():
+        histogram.setdefault(row["product_id"], {})[row["rating"]] = row["total"]
+    for product_id, counts in histogram.items():
+        total = sum(counts.values())
+        Product.objects.filter(pk=product_id).update(
+            rating_count=total,
+            rating_avg=sum(star * count for star, count in counts.items()) / total,
+            **{f"rating_{star}": counts.get(star, 0) for star in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_main_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="امتیاز ۱"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="امتیاز ۲"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="امتیاز ۳"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="امتیاز ۴"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="امتیاز ۵"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.FloatField(
+                db_index=True, default=0, editable=False, verbose_name="میانگین امتیاز"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="تعداد امتیازها"
+            ),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
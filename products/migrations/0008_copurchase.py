@@ -0,0 +1,66 @@
+# Generated by Django 4.2 on 2026-10-18 15:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_rating_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoPurchase",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "score",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="تعداد خرید همزمان"
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="co_purchases",
+                        to="products.product",
+                        verbose_name="محصول",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommended_in",
+                        to="products.product",
+                        verbose_name="محصول مرتبط",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "خرید همزمان",
+                "verbose_name_plural": "خریدهای همزمان",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="copurchase",
+            index=models.Index(
+                fields=["product", "-score"], name="products_copurchase_top"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="copurchase",
+            unique_together={("product", "related")},
+        ),
+    ]
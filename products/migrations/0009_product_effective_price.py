@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 16:01
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def fill_effective_price(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Product.objects.update(effective_price=Coalesce(F("discount_price"), F("price")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_copurchase"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="effective_price",
+            field=models.DecimalField(
+                db_index=True,
+                decimal_places=0,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="قیمت نهایی",
+            ),
+        ),
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 4.2 on 2026-10-18 16:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_sales_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(default=0, verbose_name="موجودی انبار"),
+                ),
+                (
+                    "reserved",
+                    models.PositiveIntegerField(
+                        default=0, editable=False, verbose_name="رزرو شده"
+                    ),
+                ),
+                (
+                    "color",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="products.color",
+                        verbose_name="رنگ",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stocks",
+                        to="products.product",
+                        verbose_name="محصول",
+                    ),
+                ),
+                (
+                    "size",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="products.size",
+                        verbose_name="سایز",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "موجودی",
+                "verbose_name_plural": "موجودی\u200cها",
+            },
+        ),
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("owner", models.CharField(max_length=64, verbose_name="صاحب رزرو")),
+                ("quantity", models.PositiveIntegerField(verbose_name="تعداد")),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="زمان انقضا"),
+                ),
+                (
+                    "stock",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="products.stock",
+                        verbose_name="موجودی",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "رزرو موجودی",
+                "verbose_name_plural": "رزروهای موجودی",
+                "unique_together": {("owner", "stock")},
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stock",
+            constraint=models.UniqueConstraint(
+                models.F("product"),
+                django.db.models.functions.comparison.Coalesce(
+                    "color", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce("size", models.Value(0)),
+                name="products_stock_unique_variant",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_stock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=50, unique=True, verbose_name="نام"),
+                ),
+                ("version", models.BigIntegerField(default=0, verbose_name="نسخه")),
+            ],
+            options={
+                "verbose_name": "نسخه کش",
+                "verbose_name_plural": "نسخه\u200cهای کش",
+            },
+        ),
+    ]
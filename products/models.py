@@ -2,6 +2,83 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
+from django.db.models import OuterRef, Subquery, Value, F, Case, When, Count, FloatField, DecimalField
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce, Cast
+
+class ProductQuerySet(models.QuerySet):
+    # ستون‌های لازم برای کارت محصول و کلیدهای مرتب‌سازی لیست محصولات
+    CARD_FIELDS = (
+        'id', 'name', 'slug', 'price', 'discount_price', 'effective_price', 'category', 'is_new', 'main_image',
+        'views_count', 'sales_count', 'created_at', 'rating_avg', 'rating_count',
+    )
+
+    PRICE_FIELDS = ('price', 'discount_price')
+
+    def update(self, **kwargs):
+        """هر تغییر قیمت در UPDATE گروهی، قیمت مؤثر را هم در همان دستور به‌روز می‌کند"""
+        if 'effective_price' not in kwargs and any(field in kwargs for field in self.PRICE_FIELDS):
+            values = []
+            for field in ('discount_price', 'price'):
+                value = kwargs.get(field, F(field))
+                values.append(value if isinstance(value, Combinable) else Value(value))
+            kwargs['effective_price'] = Coalesce(*values, output_field=DecimalField(max_digits=10, decimal_places=0))
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.effective_price = obj.compute_effective_price()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if any(field in fields for field in self.PRICE_FIELDS) and 'effective_price' not in fields:
+            for obj in objs:
+                obj.effective_price = obj.compute_effective_price()
+            fields.append('effective_price')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def cards(self):
+        """فقط ستون‌های مورد نیاز کارت محصول به همراه تصویر اصلی در یک کوئری"""
+        return self.only(*self.CARD_FIELDS)
+
+    def refresh_main_images(self):
+        """به‌روزرسانی تصویر اصلی ذخیره‌شده محصولات با یک دستور UPDATE"""
+        main_image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_main', 'id').values('image')[:1]
+        return self.update(main_image=Coalesce(Subquery(main_image), Value('')))
+
+    def apply_rating(self, rating, delta):
+        """افزودن (delta=1) یا کم کردن (delta=-1) یک امتیاز از هیستوگرام و میانگین، با یک UPDATE"""
+        counts = {star: F(f'rating_{star}') + (delta if star == rating else 0) for star in range(1, 6)}
+        total = sum(star * counts[star] for star in range(1, 6))
+        return self.update(
+            rating_count=F('rating_count') + delta,
+            rating_avg=Case(
+                When(rating_count__gt=-delta, then=Cast(total, FloatField()) / (F('rating_count') + delta)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+            **{f'rating_{rating}': counts[rating]},
+        )
+
+    def refresh_ratings(self):
+        """محاسبه دوباره آمار امتیاز از روی نظرات (برای اصلاح یا پر کردن اولیه)"""
+        histogram = {}
+        rows = Review.objects.filter(product__in=self).values('product_id', 'rating').annotate(total=Count('id'))
+        for row in rows.order_by():
+            histogram.setdefault(row['product_id'], {})[row['rating']] = row['total']
+        for product in self.only('id'):
+            counts = histogram.get(product.id, {})
+            total = sum(counts.values())
+            Product.objects.filter(pk=product.id).update(
+                rating_count=total,
+                rating_avg=sum(star * count for star, count in counts.items()) / total if total else 0,
+                **{f'rating_{star}': counts.get(star, 0) for star in range(1, 6)},
+            )
 
 class Product(models.Model):
     name = models.CharField(max_length=200, verbose_name="نام محصول")
@@ -9,6 +86,7 @@ class Product(models.Model):
     description = models.TextField(verbose_name="توضیحات")
     price = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="قیمت")
     discount_price = models.DecimalField(max_digits=10, decimal_places=0, null=True, blank=True, verbose_name="قیمت با تخفیف")
+    effective_price = models.DecimalField(max_digits=10, decimal_places=0, default=0, db_index=True, editable=False, verbose_name="قیمت نهایی")
     stock_status = models.BooleanField(default=True, verbose_name="موجودی")
     category = models.CharField(max_length=100, verbose_name="دسته‌بندی")
     brand = models.CharField(max_length=100, verbose_name="برند")
@@ -18,12 +96,28 @@ class Product(models.Model):
     sales_count = models.IntegerField(default=0, verbose_name="تعداد فروش")
     is_new = models.BooleanField(default=False, verbose_name="جدید")
     is_featured = models.BooleanField(default=False, verbose_name="ویژه") 
+    main_image = models.ImageField(upload_to='products/', blank=True, editable=False, verbose_name="تصویر اصلی")
+    rating_avg = models.FloatField(default=0, db_index=True, editable=False, verbose_name="میانگین امتیاز")
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد امتیازها")
+    rating_1 = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز ۱")
+    rating_2 = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز ۲")
+    rating_3 = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز ۳")
+    rating_4 = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز ۴")
+    rating_5 = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز ۵")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ به‌روزرسانی")
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "محصول"
         verbose_name_plural = "محصولات"
+        # مرتب‌سازی‌های keyset فهرست محصولات (ستون، id)؛ ایندکس صعودی برای ترتیب نزولی برعکس پیمایش می‌شود
+        indexes = [
+            models.Index(fields=['views_count', 'id'], name='products_product_views'),
+            models.Index(fields=['sales_count', 'id'], name='products_product_sales'),
+            models.Index(fields=['created_at', 'id'], name='products_product_created'),
+        ]
 
     def __str__(self):
         return self.name
@@ -31,6 +125,17 @@ class Product(models.Model):
     def get_absolute_url(self):
         return reverse('products:product_detail', kwargs={'slug': self.slug})
 
+    def compute_effective_price(self):
+        """قیمتی که مشتری می‌بیند: قیمت با تخفیف در صورت وجود، وگرنه قیمت اصلی"""
+        return self.discount_price if self.discount_price is not None else self.price
+
+    def save(self, *args, **kwargs):
+        self.effective_price = self.compute_effective_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and any(field in update_fields for field in ProductQuerySet.PRICE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'effective_price'}
+        super().save(*args, **kwargs)
+
     def get_discount_percentage(self):
         if self.discount_price and self.price:
             return int(((self.price - self.discount_price) / self.price) * 100)
@@ -109,9 +214,90 @@ class ShippingPolicy(models.Model):
 
     def __str__(self):
         return self.title
-    
 
+class CoPurchase(models.Model):
+    product = models.ForeignKey(Product, related_name='co_purchases', on_delete=models.CASCADE, verbose_name="محصول")
+    related = models.ForeignKey(Product, related_name='recommended_in', on_delete=models.CASCADE, verbose_name="محصول مرتبط")
+    score = models.PositiveIntegerField(default=0, verbose_name="تعداد خرید همزمان")
+
+    class Meta:
+        verbose_name = "خرید همزمان"
+        verbose_name_plural = "خریدهای همزمان"
+        unique_together = ('product', 'related')
+        indexes = [models.Index(fields=['product', '-score'], name='products_copurchase_top')]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.related_id} ({self.score})"
 
+class SalesEvent(models.Model):
+    product = models.ForeignKey(Product, related_name='sales_events', on_delete=models.CASCADE, verbose_name="محصول")
+    quantity = models.IntegerField(verbose_name="تغییر تعداد فروش")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ثبت")
 
+    class Meta:
+        verbose_name = "رویداد فروش"
+        verbose_name_plural = "رویدادهای فروش"
 
-    
\ No newline at end of file
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity:+d}"
+
+class LedgerCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="نام")
+    last_id = models.BigIntegerField(default=0, verbose_name="آخرین شناسه اعمال‌شده")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ به‌روزرسانی")
+
+    class Meta:
+        verbose_name = "نقطه بازبینی دفتر"
+        verbose_name_plural = "نقاط بازبینی دفتر"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+class CacheVersion(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="نام")
+    version = models.BigIntegerField(default=0, verbose_name="نسخه")
+
+    class Meta:
+        verbose_name = "نسخه کش"
+        verbose_name_plural = "نسخه‌های کش"
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+class Stock(models.Model):
+    product = models.ForeignKey(Product, related_name='stocks', on_delete=models.CASCADE, verbose_name="محصول")
+    color = models.ForeignKey(Color, null=True, blank=True, on_delete=models.CASCADE, verbose_name="رنگ")
+    size = models.ForeignKey(Size, null=True, blank=True, on_delete=models.CASCADE, verbose_name="سایز")
+    quantity = models.PositiveIntegerField(default=0, verbose_name="موجودی انبار")
+    reserved = models.PositiveIntegerField(default=0, editable=False, verbose_name="رزرو شده")
+
+    class Meta:
+        verbose_name = "موجودی"
+        verbose_name_plural = "موجودی‌ها"
+        constraints = [
+            models.UniqueConstraint(
+                F('product'), Coalesce('color', Value(0)), Coalesce('size', Value(0)),
+                name='products_stock_unique_variant',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}/{self.color_id or '-'}/{self.size_id or '-'}: {self.quantity}"
+
+    @property
+    def available(self):
+        return max(self.quantity - self.reserved, 0)
+
+class StockReservation(models.Model):
+    owner = models.CharField(max_length=64, verbose_name="صاحب رزرو")
+    stock = models.ForeignKey(Stock, related_name='reservations', on_delete=models.CASCADE, verbose_name="موجودی")
+    quantity = models.PositiveIntegerField(verbose_name="تعداد")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="زمان انقضا")
+
+    class Meta:
+        verbose_name = "رزرو موجودی"
+        verbose_name_plural = "رزروهای موجودی"
+        unique_together = ('owner', 'stock')
+
+    def __str__(self):
+        return f"{self.owner}: {self.stock_id} × {self.quantity}"
@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'products.pagination.cursor'
+
+# کلید مرتب‌سازی هر حالت؛ id همیشه آخرین کلید است تا ترتیب یکتا باشد
+SORT_KEYS = {
+    'most_viewed': ('-views_count', '-id'),
+    'best_selling': ('-sales_count', '-id'),
+    'newest': ('-created_at', '-id'),
+    'cheapest': ('effective_price', 'id'),
+    'most_expensive': ('-effective_price', '-id'),
+    'top_rated': ('-rating_avg', '-id'),
+    'relevance': ('search_rank', 'id'),
+    'default': ('id',),
+}
+
+_PARSERS = {
+    'views_count': int,
+    'sales_count': int,
+    'created_at': parse_datetime,
+    'effective_price': Decimal,
+    'rating_avg': float,
+    'search_rank': float,
+    'id': int,
+}
+
+
+def _encode_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage:
+    """صفحه‌ای از نتایج صفحه‌بندی کلیدی؛ به جای شماره صفحه، مکان‌نما دارد"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.has_next = next_cursor is not None
+        self.has_previous = previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """صفحه‌بندی بر اساس آخرین (کلید مرتب‌سازی، id) دیده‌شده بدون COUNT و OFFSET"""
+
+    def __init__(self, queryset, per_page, sort='default'):
+        self.sort = sort if sort in SORT_KEYS else 'default'
+        self.keys = SORT_KEYS[self.sort]
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def _fields(self):
+        return [key.lstrip('-') for key in self.keys]
+
+    def _make_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, field)) for field in self._fields()]
+        return signing.dumps({'s': self.sort, 'd': direction, 'v': values}, salt=CURSOR_SALT)
+
+    def _read_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return None
+        if data.get('s') != self.sort or data.get('d') not in ('next', 'prev'):
+            return None
+        try:
+            values = [_PARSERS[field](value) for field, value in zip(self._fields(), data['v'])]
+        except (KeyError, TypeError, ValueError, ArithmeticError):
+            return None
+        if len(values) != len(self.keys) or None in values:
+            return None
+        return data['d'], values
+
+    def _after(self, values, reverse):
+        """شرط «بعد از» مقادیر داده‌شده در جهت مرتب‌سازی (یا خلاف آن)"""
+        condition = Q()
+        equal = Q()
+        for key, value in zip(self.keys, values):
+            field = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def page(self, cursor=None):
+        state = self._read_cursor(cursor)
+        direction, values = state if state else ('next', None)
+        reverse = direction == 'prev'
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        ordering = self.keys
+        if reverse:
+            ordering = [key[1:] if key.startswith('-') else f'-{key}' for key in self.keys]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = self._make_cursor(rows[-1], 'next') if rows and has_next else None
+        previous_cursor = self._make_cursor(rows[0], 'prev') if rows and has_previous else None
+        return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,64 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from . import models
+
+LinePrice = namedtuple('LinePrice', 'product_id quantity total_price discount')
+
+
+def table(product_ids):
+    """جدول قیمت {product_id: (price, discount_price)} با یک کوئری
+
+    شناسه محصولات حذف‌شده در خروجی نیست. قیمت‌ها کش نمی‌شوند چون سبد و پرداخت باید
+    قیمت همان لحظه را ببینند و معمولاً محصولات همراه آیتم‌ها از قبل خوانده شده‌اند.
+    """
+    ids = set(product_ids)
+    if not ids:
+        return {}
+    return {
+        product_id: (price, discount_price)
+        for product_id, price, discount_price in models.Product.objects.filter(pk__in=ids).values_list(
+            'id', 'price', 'discount_price'
+        )
+    }
+
+
+def price_lines(lines, prices=None):
+    """قیمت‌گذاری دسته‌ای ردیف‌های (product_id, quantity) از روی جدول قیمت
+
+    خروجی هر ردیف دقیقاً برابر CartItem.get_total_price و CartItem.get_discount است و
+    ردیف‌های محصولات حذف‌شده نادیده گرفته می‌شوند. اگر قیمت‌ها از قبل در حافظه باشند
+    می‌توان جدول {product_id: (price, discount_price)} را مستقیم داد.
+    """
+    lines = list(lines)
+    if prices is None:
+        prices = table(product_id for product_id, _ in lines)
+    result = []
+    for product_id, quantity in lines:
+        entry = prices.get(product_id)
+        if entry is None:
+            continue
+        price, discount_price = entry
+        unit_price = discount_price if discount_price is not None else price if price is not None else 0
+        if discount_price is not None and price is not None and discount_price < price:
+            discount = quantity * (price - discount_price)
+        else:
+            discount = 0
+        result.append(LinePrice(product_id, quantity, quantity * unit_price, discount))
+    return result
+
+
+def summarize(priced):
+    """جمع کل، تخفیف و مبلغ نهایی خروجی price_lines"""
+    total_price = sum((line.total_price for line in priced), Decimal('0'))
+    total_discount = sum((line.discount for line in priced), Decimal('0'))
+    return {
+        'total_price': total_price,
+        'total_discount': total_discount,
+        'final_price': total_price - total_discount,
+    }
+
+
+def totals(lines, prices=None):
+    """جمع کل، تخفیف و مبلغ نهایی ردیف‌های (product_id, quantity) در یک گذر"""
+    return summarize(price_lines(lines, prices))
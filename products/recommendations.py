@@ -0,0 +1,106 @@
+from collections import Counter
+from itertools import permutations
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Product, CoPurchase
+
+# حداکثر محصول مرتبطی که برای هر محصول نگه داشته می‌شود (هم در rebuild و هم در record_order)
+TOP = 20
+
+
+def _upsert_pairs(pairs):
+    """افزایش امتیاز جفت‌ها با INSERT ... ON CONFLICT DO UPDATE در یک دستور"""
+    if not pairs:
+        return
+    table = connection.ops.quote_name(CoPurchase._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (product_id, related_id, score) VALUES (%s, %s, %s) "
+        f"ON CONFLICT (product_id, related_id) DO UPDATE SET score = {table}.score + excluded.score"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(a, b, score) for (a, b), score in pairs.items()])
+
+
+def _trim(product_ids, top):
+    """حذف جفت‌های بیرون از top محصول اول هر محصول با همان ترتیب rebuild (امتیاز، سپس شناسه)"""
+    extra = list(
+        CoPurchase.objects.filter(product_id__in=product_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('product_id'), order_by=[F('score').desc(), F('related_id')]))
+        .filter(rank__gt=top)
+        .values_list('id', flat=True)
+    )
+    if extra:
+        CoPurchase.objects.filter(id__in=extra).delete()
+
+
+def record_order(order, product_ids=None, top=TOP):
+    """افزودن جفت محصولات یک سفارش جدید به ماتریس خرید همزمان
+
+    اگر شناسه محصولات از قبل در دست باشد با product_ids داده می‌شود تا دوباره خوانده نشوند.
+    مثل rebuild برای هر محصول فقط top جفت اول نگه داشته می‌شود تا جدول با هر سفارش بزرگ نشود.
+    """
+    if product_ids is None:
+        product_ids = order.orderitems.values_list('product_id', flat=True)
+    product_ids = sorted(set(product_ids))
+    pairs = Counter(permutations(product_ids, 2))
+    if not pairs:
+        return
+    with transaction.atomic():
+        _upsert_pairs(pairs)
+        if top:
+            _trim(product_ids, top)
+
+
+def rebuild(top=TOP, chunk_size=5000):
+    """ساخت دوباره کل ماتریس از روی آیتم‌های سفارش
+
+    آیتم‌ها به ترتیب سفارش به صورت جریانی خوانده می‌شوند و برای هر محصول فقط
+    top محصول پرتکرار نگه داشته می‌شود. تعداد خطوط خوانده‌شده برگردانده می‌شود.
+    """
+    OrderItem = apps.get_model('cart', 'OrderItem')
+    pairs = Counter()
+    lines = 0
+    current_order, basket = None, set()
+    rows = OrderItem.objects.order_by('order_id').values_list('order_id', 'product_id')
+    for order_id, product_id in rows.iterator(chunk_size=chunk_size):
+        lines += 1
+        if order_id != current_order:
+            pairs.update(permutations(sorted(basket), 2))
+            current_order, basket = order_id, set()
+        basket.add(product_id)
+    pairs.update(permutations(sorted(basket), 2))
+
+    neighbours = {}
+    for (product_id, related_id), score in pairs.items():
+        neighbours.setdefault(product_id, []).append((score, related_id))
+    objects = []
+    for product_id, scored in neighbours.items():
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        for score, related_id in scored[:top] if top else scored:
+            objects.append(CoPurchase(product_id=product_id, related_id=related_id, score=score))
+
+    with transaction.atomic():
+        CoPurchase.objects.all().delete()
+        CoPurchase.objects.bulk_create(objects, batch_size=chunk_size)
+    return lines, len(objects)
+
+
+def related_products(product, limit=4):
+    """محصولاتی که بیشتر همراه این محصول خریده شده‌اند؛ کمبود با هم‌دسته‌ها پر می‌شود"""
+    related = list(
+        Product.objects.cards()
+        .filter(recommended_in__product=product)
+        .order_by('-recommended_in__score', 'id')[:limit]
+    )
+    if len(related) < limit:
+        exclude = [product.pk] + [item.pk for item in related]
+        related += list(
+            Product.objects.cards()
+            .filter(category=product.category)
+            .exclude(pk__in=exclude)[:limit - len(related)]
+        )
+    return related
@@ -0,0 +1,98 @@
+import re
+
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+FTS_COLUMNS = ('name', 'description', 'tags', 'brand', 'product_code')
+# وزن bm25 برای هر ستون به ترتیب FTS_COLUMNS
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 3.0, 8.0)
+
+_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON products_product BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); "
+        f"END"
+    ),
+}
+
+
+def ensure_fts_index(using='default'):
+    """ساخت جدول FTS5 و تریگرهای همگام‌سازی در صورت نبود
+
+    بازسازی جدول products_product در مایگریشن‌های SQLite تریگرها را حذف می‌کند،
+    پس بعد از هر migrate تریگرها دوباره ساخته و ایندکس بازسازی می‌شود.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f'{FTS_TABLE}%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE in existing and existing.issuperset(FTS_TRIGGERS):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{_columns}, content='products_product', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        for sql in FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(text):
+    """تبدیل عبارت کاربر به کوئری امن FTS5 با جستجوی پیشوندی برای هر کلمه"""
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_products(queryset, text):
+    """فیلتر و رتبه‌بندی محصولات بر اساس متن؛ رتبه در search_rank (کمتر = مرتبط‌تر)"""
+    match = build_match_query(text)
+    if not match:
+        return queryset.annotate(search_rank=Value(0.0))
+    if connections[queryset.db].vendor != 'sqlite':
+        condition = Q()
+        for column in FTS_COLUMNS:
+            condition |= Q(**{f'{column}__icontains': text})
+        return queryset.filter(condition).annotate(search_rank=Value(0.0))
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = products_product.id",
+            [match],
+        )
+    )
+
+
+def matching_ids(text, using='default'):
+    """شناسه محصولات منطبق با متن، بدون اعمال سایر فیلترها"""
+    from .models import Product
+
+    if not build_match_query(text):
+        return None
+    queryset = search_products(Product.objects.using(using), text)
+    return list(queryset.values_list('id', flat=True).order_by())
@@ -0,0 +1,55 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import facets
+from .search import ensure_fts_index
+from .models import Product, ProductImage, Color, Size, Review
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def invalidate_facets(sender, **kwargs):
+    """بی‌اعتبار کردن ایندکس فیلترها پس از تغییر محصول، رنگ یا سایز"""
+    facets.invalidate()
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_main_image(sender, instance, **kwargs):
+    """به‌روزرسانی تصویر اصلی ذخیره‌شده روی محصول"""
+    Product.objects.filter(pk=instance.product_id).refresh_main_images()
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._saved_rating = (instance.product_id, instance.rating) if instance.pk else None
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """اعمال تغییر نظر روی آمار امتیاز محصول به صورت افزایشی"""
+    current = (instance.product_id, instance.rating)
+    previous = None if created else instance._saved_rating
+    if previous == current:
+        return
+    if previous is not None:
+        Product.objects.filter(pk=previous[0]).apply_rating(previous[1], -1)
+    Product.objects.filter(pk=current[0]).apply_rating(current[1], 1)
+    instance._saved_rating = current
+    facets.invalidate()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    product_id, rating = instance._saved_rating or (instance.product_id, instance.rating)
+    Product.objects.filter(pk=product_id).apply_rating(rating, -1)
+    facets.invalidate()
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """ساخت یا بازسازی ایندکس جستجوی تمام‌متن پس از migrate"""
+    ensure_fts_index(using)
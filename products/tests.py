@@ -1,3 +1,74 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase
+
+from . import sales
+from .models import Product, SalesEvent
+
+
+class SalesLedgerTests(TransactionTestCase):
+    """ثبت همزمان فروش از چند نخ و اعمال دقیق آن روی sales_count"""
+
+    THREADS = 8
+    PER_THREAD = 25
+
+    def setUp(self):
+        self.product = Product.objects.create(name='p', slug='p', price=100)
+        self.other = Product.objects.create(name='q', slug='q', price=100)
+
+    def _run(self, target, count):
+        errors = []
+
+        def wrapper():
+            try:
+                target()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=wrapper) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, errors
+
+    def _record(self):
+        for _ in range(self.PER_THREAD):
+            sales.record([(self.product.id, 2), (self.other.id, 1), (self.other.id, -1)])
+
+    def test_concurrent_record_then_rollup(self):
+        threads, errors = self._run(self._record, self.THREADS)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        events = self.THREADS * self.PER_THREAD
+        self.assertEqual(SalesEvent.objects.count(), events)
+        self.assertEqual(sales.rollup(batch_size=30, settle_seconds=0), events)
+        self.assertEqual(sales.rollup(settle_seconds=0), 0)
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.sales_count, events * 2)
+        self.assertEqual(self.other.sales_count, 0)
+
+    def test_rollup_while_recording(self):
+        done = threading.Event()
+
+        def roll():
+            while not done.is_set():
+                sales.rollup(batch_size=7, settle_seconds=0)
+
+        writers, errors = self._run(self._record, self.THREADS)
+        rollers, roll_errors = self._run(roll, 2)
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in rollers:
+            thread.join()
+        self.assertEqual(errors + roll_errors, [])
+
+        sales.rollup(settle_seconds=0)
+        self.assertEqual(sales.pending(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.sales_count, self.THREADS * self.PER_THREAD * 2)
@@ -7,4 +7,5 @@ urlpatterns = [
     path('product_list', views.product_list, name='product_list'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('product/<slug:slug>/add_review/', views.add_review, name='add_review'),
+    path('counters/stats/', views.counter_stats, name='counter_stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from django.db.models import F
+
+from . import models
+
+
+def current(name):
+    """نسخه فعلی یک داده کش‌شده (۰ اگر هنوز تغییری ثبت نشده)
+
+    نسخه در دیتابیس است تا همه پروسه‌ها و سرورها تغییر آن را ببینند؛ خود داده در
+    حافظه هر پروسه با این نسخه نگه داشته می‌شود.
+    """
+    return models.CacheVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def bump(name):
+    """افزایش نسخه در همان تراکنشی که داده را تغییر داده است؛ با rollback نسخه هم برمی‌گردد"""
+    if models.CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+        return
+    _, created = models.CacheVersion.objects.get_or_create(name=name, defaults={'version': 1})
+    if not created:
+        models.CacheVersion.objects.filter(name=name).update(version=F('version') + 1)
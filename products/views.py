@@ -1,67 +1,91 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Avg
-from .models import Product, Review, Color, Size
+from django.http import JsonResponse
+from .models import Product, Review
+from . import facets
+from .search import search_products, matching_ids
+from .pagination import KeysetPaginator, SORT_KEYS
+from .counters import view_counter
+from . import recommendations
+
+
+def is_admin(user):
+    return user.is_staff or user.is_superuser
 
 
 def product_list(request):
-    products = Product.objects.all()
+    products = Product.objects.cards()
     category = request.GET.get('category')
     color = request.GET.get('color')
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
     size = request.GET.get('size')
     brand = request.GET.get('brand')
+    min_rating = request.GET.get('min_rating')
     sort = request.GET.get('sort')
+    query = (request.GET.get('search') or '').strip()
+
+    if query:
+        products = search_products(products, query)
 
     if category and category != 'all':
         products = products.filter(category=category)
     if color:
         products = products.filter(colors__hex_code=color)
     if min_price:
-        products = products.filter(price__gte=min_price)
+        products = products.filter(effective_price__gte=min_price)
     if max_price:
-        products = products.filter(price__lte=max_price)
+        products = products.filter(effective_price__lte=max_price)
     if size:
         products = products.filter(sizes__name=size, sizes__available=True)
     if brand and brand != 'all':
         products = products.filter(brand=brand)
-    if sort == 'most_viewed':
-        products = products.order_by('-views_count')
-    elif sort == 'best_selling':
-        products = products.order_by('-sales_count')
-    elif sort == 'newest':
-        products = products.order_by('-created_at')
-    elif sort == 'cheapest':
-        products = products.order_by('price')
-    elif sort == 'most_expensive':
-        products = products.order_by('-price')
-
-    paginator = Paginator(products, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if min_rating in facets.FacetIndex.RATING_FILTERS:
+        products = products.filter(rating_avg__gte=int(min_rating))
+    if sort not in SORT_KEYS or sort in ('default', 'relevance'):
+        sort = 'relevance' if query else 'default'
+
+    filters = {
+        'category': category,
+        'color': color,
+        'min_price': min_price,
+        'max_price': max_price,
+        'size': size,
+        'brand': brand,
+        'min_rating': min_rating,
+    }
+    search_ids = matching_ids(query) if query else None
+    index = facets.get_index()
+    facet_counts = index.facets(filters, ids=search_ids)
+
+    if request.GET.get('page'):
+        paginator = Paginator(products.order_by(*SORT_KEYS[sort]), 9)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        page_obj = KeysetPaginator(products, 9, sort).page(request.GET.get('cursor'))
 
     context = {
         'products': page_obj,
-        'categories': Product.objects.values('category').distinct(),
-        'colors': Color.objects.values('hex_code', 'name').distinct(),
-        'sizes': Size.objects.filter(available=True).values('name').distinct(),
-        'brands': Product.objects.values('brand').distinct(),
+        'categories': facet_counts['categories'],
+        'colors': facet_counts['colors'],
+        'sizes': facet_counts['sizes'],
+        'brands': facet_counts['brands'],
+        'ratings': facet_counts['ratings'],
+        'price_histogram': facet_counts['prices'],
+        'total_count': index.count(filters, ids=search_ids),
     }
     return render(request, 'products/product_list.html', context)
 
 
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug)
-    product.views_count += 1
-    product.save()
+    view_counter.incr(product.pk)
 
-    avg_rating = product.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-    avg_rating = round(avg_rating, 1)
+    avg_rating = round(product.rating_avg, 1)
 
-    related_products = Product.objects.filter(category=product.category).exclude(slug=slug)[:4]
+    related_products = recommendations.related_products(product, 4)
 
     context = {
         'product': product,
@@ -97,4 +121,11 @@ def add_review(request, slug):
                 messages.error(request, 'امتیاز نامعتبر است.')
         else:
             messages.error(request, 'لطفاً امتیاز و نظر خود را وارد کنید.')
-    return redirect(product.get_absolute_url())
\ No newline at end of file
+    return redirect(product.get_absolute_url())
+
+
+@login_required
+@user_passes_test(is_admin)
+def counter_stats(request):
+    """وضعیت بافر شمارنده بازدید این پروسه، از جمله تأخیر نوشتن"""
+    return JsonResponse(view_counter.stats())
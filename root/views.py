@@ -4,6 +4,7 @@ from django.contrib import messages
 from .models import Story, ContactMessage, AboutSection
 from .forms import StoryForm, ContactForm
 from products.models import Product
+from cart import rollups
 from django.http import JsonResponse
 
 def staff_required(user):
@@ -11,11 +12,11 @@ def staff_required(user):
 
 def index(request):
     stories = Story.objects.filter(is_active=True)
-    featured_products = Product.objects.filter(is_featured=True)[:6]
+    featured_products = Product.objects.cards().filter(is_featured=True)[:6]
     if not featured_products:
-        featured_products = Product.objects.filter(is_new=True)[:6] 
+        featured_products = Product.objects.cards().filter(is_new=True)[:6] 
         if not featured_products:
-            featured_products = Product.objects.filter(discount_price__isnull=False)[:6] 
+            featured_products = Product.objects.cards().filter(discount_price__isnull=False)[:6] 
     context = {
         'stories': stories,
         'featured_products': featured_products,
@@ -74,7 +75,8 @@ def about_view(request):
 @user_passes_test(staff_required)
 @login_required
 def dashboard(request):
-    return render(request, "admin/root/dashboard.html")
+    """شاخص‌های فروش از جدول‌های تجمیعی خوانده می‌شوند، نه از کل جدول سفارش‌ها"""
+    return render(request, "admin/root/dashboard.html", {'sales': rollups.dashboard()})
 
 @user_passes_test(staff_required)
 @login_required